@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, g, send_from_directory
 import os
 import requests
 import json
@@ -12,6 +12,28 @@ import socket
 import urllib3
 import traceback
 import sys
+import contextlib
+import contextvars
+import queue
+import threading
+import re
+import mimetypes
+import collections
+import io
+import math
+import itertools
+import concurrent.futures
+import codecs
+import functools
+import hashlib
+import html.parser
+import urllib.parse
+import dataclasses
+import ipaddress
+import sqlite3
+import base64
+import datetime
+import csv
 
 # Configure logging first
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -30,6 +52,14 @@ except ImportError as e:
     FAL_CLIENT_AVAILABLE = False
     logger.warning(f"fal_client kütüphanesi yüklenemedi: {str(e)}. Video oluşturma özellikleri devre dışı olacak.")
 
+# Pillow kütüphanesini içe aktar - en-boy oranı varyantları için
+try:
+    from PIL import Image, ImageFilter, ImageOps
+    PIL_AVAILABLE = True
+except ImportError as e:
+    PIL_AVAILABLE = False
+    logger.warning(f"Pillow kütüphanesi yüklenemedi: {str(e)}. Görsel varyantı türetme devre dışı olacak.")
+
 # DNS çözümleme zaman aşımını artır
 socket.setdefaulttimeout(30)  # 30 saniye
 
@@ -50,68 +80,2018 @@ except Exception as e:
 # Initialize Flask app
 app = Flask(__name__)
 
-# API anahtarları
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-FAL_API_KEY = os.getenv("FAL_API_KEY")
-ASSISTANT_ID = os.getenv("ASSISTANT_ID")
-ASTRIA_API_URL = os.getenv("ASTRIA_API_URL")
-ASTRIA_API_KEY = os.getenv("ASTRIA_API_KEY")
+# API anahtarları
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+FAL_API_KEY = os.getenv("FAL_API_KEY")
+ASSISTANT_ID = os.getenv("ASSISTANT_ID")
+ASTRIA_API_URL = os.getenv("ASTRIA_API_URL")
+ASTRIA_API_KEY = os.getenv("ASTRIA_API_KEY")
+
+# Log API key availability (not the actual keys)
+logger.info(f"OPENAI_API_KEY mevcut: {bool(OPENAI_API_KEY)}")
+logger.info(f"FAL_API_KEY mevcut: {bool(FAL_API_KEY)}")
+logger.info(f"ASTRIA_API_KEY mevcut: {bool(ASTRIA_API_KEY)}")
+
+# Fal.ai API yapılandırması - FAL_KEY çevre değişkenini ayarla
+if FAL_API_KEY:
+    os.environ["FAL_KEY"] = FAL_API_KEY
+    logger.info(f"FAL_KEY çevre değişkeni ayarlandı: {FAL_API_KEY[:4]}..." if FAL_API_KEY else "FAL_KEY ayarlanamadı")
+else:
+    logger.warning("FAL_API_KEY bulunamadı, FAL_KEY çevre değişkeni ayarlanamadı.")
+
+# OpenAI istemcisini yapılandır
+client = None
+try:
+    if OPENAI_API_KEY:
+        # OpenAI API anahtarını doğrudan ayarla
+        openai.api_key = OPENAI_API_KEY
+        
+        # OpenAI istemcisini oluştur
+        client = OpenAI(
+            api_key=OPENAI_API_KEY,
+        )
+        
+        # API bağlantısını test et
+        logger.info("OpenAI API bağlantısı test ediliyor...")
+        models = client.models.list()
+        logger.info(f"OpenAI API bağlantısı başarılı. Kullanılabilir model sayısı: {len(models.data)}")
+    else:
+        logger.warning("OPENAI_API_KEY bulunamadı, OpenAI istemcisi oluşturulamadı.")
+except Exception as e:
+    logger.error(f"OpenAI API bağlantısı kurulamadı: {str(e)}")
+    logger.error(f"Hata izleme: {traceback.format_exc()}")
+
+# Ensure templates directory exists
+template_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+if not os.path.exists(template_dir):
+    logger.warning(f"Templates directory not found at {template_dir}. Creating it.")
+    try:
+        os.makedirs(template_dir, exist_ok=True)
+    except Exception as e:
+        logger.error(f"Failed to create templates directory: {str(e)}")
+
+# Create basic templates if they don't exist
+for template_name in ['welcome.html', 'index.html', 'image.html', 'video.html']:
+    template_path = os.path.join(template_dir, template_name)
+    if not os.path.exists(template_path):
+        logger.warning(f"Template {template_name} not found. Creating a basic version.")
+        try:
+            with open(template_path, 'w') as f:
+                f.write(f"<!DOCTYPE html><html><head><title>{template_name}</title></head><body><h1>{template_name}</h1><p>This is a placeholder template.</p></body></html>")
+        except Exception as e:
+            logger.error(f"Failed to create template {template_name}: {str(e)}")
+
+# Derlenmiş statik dosyalar (build_assets.py çıktısı)
+static_dist_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'dist')
+asset_manifest = {}
+try:
+    with open(os.path.join(static_dist_dir, 'manifest.json')) as f:
+        asset_manifest = json.load(f)
+    logger.info(f"Statik dosya manifest'i yüklendi: {len(asset_manifest)} dosya")
+except FileNotFoundError:
+    logger.info("Statik dosya manifest'i bulunamadı, dosyalar hash'siz sunulacak. (python build_assets.py)")
+except Exception as e:
+    logger.warning(f"Statik dosya manifest'i okunamadı: {str(e)}")
+
+@app.context_processor
+def inject_asset_url():
+    """Şablonlarda hash'li statik dosya adreslerini üretmek için asset_url fonksiyonunu sağlar"""
+    def asset_url(path):
+        hashed_path = asset_manifest.get(path)
+        if hashed_path:
+            return url_for('asset', filename=hashed_path)
+        return url_for('static', filename=path)
+    return {"asset_url": asset_url}
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """Hash'li statik dosyaları uzun süreli önbellek ve Accept-Encoding'e göre sıkıştırma ile sunar"""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    # İstemcinin q değerlerine göre sırala; q=0 ile reddedilen kodlamaları hiç sunma (eşitlikte br önce)
+    candidates = [(request.accept_encodings.quality(encoding), encoding, suffix)
+                  for encoding, suffix in (('br', '.br'), ('gzip', '.gz'))]
+    candidates.sort(key=lambda candidate: -candidate[0])
+    for quality, encoding, suffix in candidates:
+        if quality > 0 and os.path.isfile(os.path.join(static_dist_dir, filename + suffix)):
+            response = send_from_directory(static_dist_dir, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(static_dist_dir, filename, mimetype=mimetype)
+
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+# İzleme (tracing) yapılandırması - tek bir trace ID prompt, görsel ve video aşamaları boyunca taşınır
+TRACE_HEADER = "X-Trace-Id"
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE")  # Span'ların JSONL olarak yazılacağı dosya
+TRACE_COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL")  # Span'ların POST edileceği collector adresi
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_span_queue = queue.Queue(maxsize=10000)
+
+def _export_spans():
+    """Kuyruktaki span'ları arka planda dosyaya ve/veya collector'a aktarır"""
+    while True:
+        batch = [_span_queue.get()]
+        while len(batch) < 100:
+            try:
+                batch.append(_span_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        if TRACE_EXPORT_FILE:
+            try:
+                with open(TRACE_EXPORT_FILE, "a") as f:
+                    for span in batch:
+                        f.write(json.dumps(span, default=str) + "\n")
+            except Exception as e:
+                logger.warning(f"Span'lar dosyaya yazılamadı: {str(e)}")
+
+        if TRACE_COLLECTOR_URL:
+            try:
+                requests.post(TRACE_COLLECTOR_URL, json={"spans": batch}, timeout=5)
+            except Exception as e:
+                logger.warning(f"Span'lar collector'a gönderilemedi: {str(e)}")
+
+if TRACE_EXPORT_FILE or TRACE_COLLECTOR_URL:
+    threading.Thread(target=_export_spans, name="span-exporter", daemon=True).start()
+    logger.info(f"Span aktarımı etkin. Dosya: {TRACE_EXPORT_FILE}, Collector: {TRACE_COLLECTOR_URL}")
+
+@contextlib.contextmanager
+def trace_span(name: str, **attributes):
+    """
+    Bir işlem için span açar, süresini ve durumunu kaydeder.
+    Üst span varsa aynı trace ID'yi kullanır; yoksa yeni bir trace başlatır.
+    """
+    parent = _current_span.get()
+    span = {
+        "trace_id": attributes.pop("trace_id", None) or (parent["trace_id"] if parent else uuid.uuid4().hex),
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "start_time": time.time(),
+        "status": "ok",
+        "attributes": attributes
+    }
+    token = _current_span.set(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except Exception as e:
+        span["status"] = "error"
+        span["attributes"]["error"] = str(e)
+        raise
+    finally:
+        span["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        _current_span.reset(token)
+        if TRACE_EXPORT_FILE or TRACE_COLLECTOR_URL:
+            try:
+                _span_queue.put_nowait(span)
+            except queue.Full:
+                logger.warning("Span kuyruğu dolu, span atlandı")
+        logger.info(f"Span: {name} trace={span['trace_id']} süre={span['duration_ms']}ms durum={span['status']}")
+
+def mark_http_status(span, status_code):
+    """Span'a upstream HTTP durum kodunu işler"""
+    span["attributes"]["status_code"] = status_code
+    if status_code >= 400:
+        span["status"] = "error"
+
+def current_trace_id():
+    """Aktif span'ın trace ID'sini döndürür"""
+    span = _current_span.get()
+    return span["trace_id"] if span else None
+
+@app.before_request
+def start_request_span():
+    """Her istek için kök span açar; istemcinin gönderdiği trace ID'yi devam ettirir"""
+    trace_id = request.headers.get(TRACE_HEADER)
+    if trace_id and not re.fullmatch(r"[0-9A-Za-z-]{8,64}", trace_id):
+        trace_id = None
+    span_cm = trace_span(f"{request.method} {request.url_rule.rule if request.url_rule else request.path}",
+                         trace_id=trace_id, path=request.path)
+    span_cm.__enter__()
+    g.request_span_cm = span_cm
+
+@app.after_request
+def add_trace_header(response):
+    """Yanıta trace ID'yi ekler ve kök span'ın durumunu işaretler"""
+    span = _current_span.get()
+    if span and getattr(g, "request_span_cm", None):
+        response.headers[TRACE_HEADER] = span["trace_id"]
+        span["attributes"]["status_code"] = response.status_code
+        if response.status_code >= 500:
+            span["status"] = "error"
+    return response
+
+@app.teardown_request
+def end_request_span(exc):
+    """Kök span'ı kapatır"""
+    span_cm = g.pop("request_span_cm", None)
+    if span_cm:
+        if exc is not None:
+            span_cm.__exit__(type(exc), exc, exc.__traceback__)
+        else:
+            span_cm.__exit__(None, None, None)
+
+# Trafik kaydı - gelen istekler ve upstream yanıtları replay_traffic.py ile tekrar oynatılmak üzere JSONL'e yazılır
+TRAFFIC_CAPTURE_FILE = os.getenv("TRAFFIC_CAPTURE_FILE")
+CAPTURE_BODY_LIMIT = 65536  # Kaydedilecek en büyük upstream JSON gövdesi (bayt)
+CAPTURED_HEADERS = ("X-Trace-Id", "X-Priority", "X-Latency-SLO", "Idempotency-Key", "Accept-Encoding")
+REDACTED_QUERY_PARAMS = ("token", "key", "api_key")
+
+_capture_request_id = contextvars.ContextVar("capture_request_id", default=None)
+_capture_queue = queue.Queue(maxsize=10000)
+
+def _write_capture():
+    """Kuyruktaki kayıtları arka planda kayıt dosyasına ekler"""
+    while True:
+        records = [_capture_queue.get()]
+        while len(records) < 500:
+            try:
+                records.append(_capture_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            with open(TRAFFIC_CAPTURE_FILE, "a") as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+        except Exception as e:
+            logger.warning(f"Trafik kaydı yazılamadı: {str(e)}")
+
+def _redact_url(url):
+    """URL'deki gizli sorgu parametrelerini kaydetmeden önce maskeler"""
+    parsed = urllib.parse.urlsplit(url)
+    query = [(k, "***" if k.lower() in REDACTED_QUERY_PARAMS else v) for k, v in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)]
+    return urllib.parse.urlunsplit(parsed._replace(query=urllib.parse.urlencode(query)))
+
+def fal_status_record(status):
+    """fal durum nesnesini (Queued, InProgress, Completed) tekrar kurulabilir biçimde kaydeder"""
+    fields = dataclasses.asdict(status) if dataclasses.is_dataclass(status) else dict(getattr(status, "__dict__", {}))
+    return {"type": type(status).__name__, "fields": fields}
+
+def capture_upstream(service, operation, duration, status=None, body=None, error=None, method=None, url=None):
+    """Bir upstream çağrısının zamanlamasını ve yanıt biçimini kayda ekler"""
+    if not TRAFFIC_CAPTURE_FILE:
+        return
+    record = {
+        "t": "up",
+        "req": _capture_request_id.get(),
+        "ts": round(time.time() - duration, 4),
+        "svc": service,
+        "op": operation,
+        "dur": round(duration, 4),
+        "status": status
+    }
+    if method:
+        record["method"] = method
+    if url:
+        record["url"] = _redact_url(url)
+    if error:
+        record["error"] = error
+    if body is not None:
+        record["body"] = body
+    try:
+        _capture_queue.put_nowait(record)
+    except queue.Full:
+        logger.warning("Trafik kaydı kuyruğu dolu, kayıt atlandı")
+
+if TRAFFIC_CAPTURE_FILE:
+    threading.Thread(target=_write_capture, name="traffic-capture", daemon=True).start()
+    _original_session_request = requests.Session.request
+
+    def _capturing_session_request(self, method, url, *args, **kwargs):
+        """Tüm requests çağrılarını (Astria, fal REST, görsel indirme) kayda alır"""
+        if TRACE_COLLECTOR_URL and url.startswith(TRACE_COLLECTOR_URL):
+            return _original_session_request(self, method, url, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            response = _original_session_request(self, method, url, *args, **kwargs)
+        except Exception as e:
+            capture_upstream("http", "request", time.perf_counter() - start, error=str(e), method=method, url=url)
+            raise
+        content_type = response.headers.get("Content-Type", "")
+        if kwargs.get("stream") and hasattr(response.raw, "stream"):
+            # Akış halindeki gövde uygulama okudukça sayılır; kayıt okuma bitince (veya bırakılınca) yazılır
+            _capture_streamed_body(response, start, method, url)
+            return response
+        body = {"content_type": content_type, "length": len(response.content)}
+        if "json" in content_type and len(response.content) <= CAPTURE_BODY_LIMIT:
+            try:
+                body = {"json": response.json() if response.content else None}
+            except ValueError:
+                # Bozuk JSON'u kayıt yüzünden uygulamaya hata olarak yansıtma
+                pass
+        capture_upstream("http", "request", time.perf_counter() - start, status=response.status_code, body=body, method=method, url=url)
+        return response
+
+    def _capture_streamed_body(response, start, method, url):
+        """Akış halindeki yanıtın okunan bayt sayısını, gövdeyi tüketmeden kaydeder"""
+        raw_stream, original_close = response.raw.stream, response.close
+        body = {"content_type": response.headers.get("Content-Type", ""), "length": 0, "streamed": True}
+        if response.is_redirect:
+            body["location"] = response.headers.get("Location")
+        recorded = []
+
+        def record():
+            if not recorded:
+                recorded.append(True)
+                capture_upstream("http", "request", time.perf_counter() - start, status=response.status_code,
+                                 body=body, method=method, url=url)
+
+        def counting_stream(*args, **kwargs):
+            try:
+                for chunk in raw_stream(*args, **kwargs):
+                    body["length"] += len(chunk)
+                    yield chunk
+            finally:
+                record()
+
+        def close():
+            # Hiç okunmadan kapatılan yanıtlar (ör. yönlendirmeler) de kayda girsin
+            record()
+            original_close()
+
+        response.raw.stream = counting_stream
+        response.close = close
+
+    requests.Session.request = _capturing_session_request
+    logger.info(f"Trafik kaydı etkin: {TRAFFIC_CAPTURE_FILE}")
+
+@app.before_request
+def start_capture():
+    """Kayıt modunda gelen isteğin içeriğini ve başlangıç zamanını saklar"""
+    if not TRAFFIC_CAPTURE_FILE:
+        return
+    g.capture_id = uuid.uuid4().hex[:12]
+    g.capture_start = time.time()
+    _capture_request_id.set(g.capture_id)
+
+@app.after_request
+def finish_capture(response):
+    """Kayıt modunda gelen isteği yanıt durumu ve süresiyle birlikte kayda ekler"""
+    if TRAFFIC_CAPTURE_FILE and getattr(g, "capture_id", None):
+        record = {
+            "t": "in",
+            "id": g.capture_id,
+            "ts": round(g.capture_start, 4),
+            "method": request.method,
+            "path": request.path,
+            "query": request.query_string.decode("utf-8", "replace"),
+            "headers": {h: request.headers[h] for h in CAPTURED_HEADERS if h in request.headers},
+            "status": response.status_code,
+            "dur": round(time.time() - g.capture_start, 4)
+        }
+        if request.form:
+            record["form"] = request.form.to_dict(flat=False)
+        elif request.is_json:
+            record["json"] = request.get_json(silent=True)
+        try:
+            _capture_queue.put_nowait(record)
+        except queue.Full:
+            logger.warning("Trafik kaydı kuyruğu dolu, kayıt atlandı")
+    return response
+
+# İstek süre bütçesi - upstream çağrıları kalan süreyle sınırlanır, süre dolunca veya istemci ayrılınca iptal edilir
+REQUEST_DEADLINE_HEADER = "X-Request-Deadline"  # İstemcinin verdiği süre bütçesi (saniye)
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "60"))  # Varsayılan istek süre bütçesi (saniye)
+VIDEO_REQUEST_DEADLINE = float(os.getenv("VIDEO_REQUEST_DEADLINE", "600"))  # Video üretimi için süre bütçesi (saniye)
+UPSTREAM_CONNECT_TIMEOUT = 5  # Upstream bağlantı kurma için en fazla süre (saniye)
+FAL_POLL_INTERVAL = 1.0  # fal.ai kuyruk durumunun kontrol aralığı (saniye)
+ENDPOINT_DEADLINES = {"generate_video": VIDEO_REQUEST_DEADLINE}
+
+_request_deadline = contextvars.ContextVar("request_deadline", default=None)
+_client_socket = contextvars.ContextVar("client_socket", default=None)
+
+class DeadlineExceeded(Exception):
+    """İsteğin süre bütçesi dolduğunda veya istemci bağlantıyı kapattığında fırlatılır"""
+
+@app.before_request
+def start_deadline():
+    """İsteğin süre bütçesini belirler; istemci X-Request-Deadline ile bütçeyi kısaltabilir"""
+    budget = ENDPOINT_DEADLINES.get(request.endpoint, REQUEST_DEADLINE)
+    try:
+        requested = float(request.headers.get(REQUEST_DEADLINE_HEADER, budget))
+        if requested > 0:
+            budget = min(budget, requested)
+    except ValueError:
+        logger.warning(f"Geçersiz {REQUEST_DEADLINE_HEADER} değeri yok sayıldı")
+    _request_deadline.set(time.monotonic() + budget)
+    _client_socket.set(request.environ.get("gunicorn.socket") or request.environ.get("werkzeug.socket"))
+
+def remaining_time():
+    """İsteğin kalan süre bütçesini saniye olarak döndürür (istek dışında None)"""
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def client_disconnected():
+    """İstemcinin bağlantıyı kapatıp kapatmadığını soketi okumadan kontrol eder"""
+    sock = _client_socket.get()
+    if sock is None or not hasattr(socket, "MSG_DONTWAIT"):
+        return False
+    try:
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except (BlockingIOError, InterruptedError, ValueError):
+        return False
+    except OSError:
+        return True
+
+def check_deadline(operation):
+    """Süre bütçesi dolduysa veya istemci ayrıldıysa DeadlineExceeded fırlatır"""
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"İstek süre bütçesi doldu ({operation})")
+    if client_disconnected():
+        raise DeadlineExceeded(f"İstemci bağlantıyı kapattı ({operation})")
+
+def upstream_timeout(operation, share=1.0, cap=None):
+    """Kalan bütçeden bu upstream çağrısına düşen payı (bağlantı, okuma) zaman aşımı olarak döndürür"""
+    check_deadline(operation)
+    remaining = remaining_time()
+    budget = REQUEST_DEADLINE if remaining is None else remaining * share
+    if cap:
+        budget = min(budget, cap)
+    return (min(UPSTREAM_CONNECT_TIMEOUT, budget), budget)
+
+def deadline_response(e):
+    """Süre aşımı veya istemci ayrılması için 504 yanıtı döndürür"""
+    message = str(e) if isinstance(e, DeadlineExceeded) else f"Upstream yanıtı süre bütçesi içinde gelmedi: {str(e)}"
+    logger.warning(message)
+    return jsonify({"error": message}), 504
+
+def cancel_fal_request(handle):
+    """fal.ai kuyruğundaki bir isteği iptal etmeyi dener"""
+    try:
+        cancel = getattr(handle, "cancel", None)
+        if cancel:
+            cancel()
+        else:
+            requests.put(
+                f"https://queue.fal.run/fal-ai/veo2/requests/{handle.request_id}/cancel",
+                headers={"Authorization": f"Key {FAL_API_KEY}"},
+                timeout=10
+            )
+        logger.info(f"Fal.ai isteği iptal edildi: {handle.request_id}")
+    except Exception as e:
+        logger.warning(f"Fal.ai isteği iptal edilemedi ({handle.request_id}): {str(e)}")
+
+# Üretim zamanlayıcısı yapılandırması - etkileşimli istekler toplu işlerle upstream kapasitesi için yarışmasın
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "4"))  # Aynı anda upstream'de çalışabilecek üretim sayısı
+GENERATION_RESERVED_INTERACTIVE = int(os.getenv("GENERATION_RESERVED_INTERACTIVE", "1"))  # Sadece etkileşimli isteklere ayrılan slot sayısı
+GENERATION_QUEUE_TIMEOUT = float(os.getenv("GENERATION_QUEUE_TIMEOUT", "120"))  # Kuyrukta en fazla bekleme süresi (saniye)
+GENERATION_LEASE_SECONDS = float(os.getenv("GENERATION_LEASE_SECONDS", "180"))  # Asenkron işlerde slotun en fazla tutulma süresi
+PRIORITY_WEIGHTS = {"interactive": 8, "batch": 2, "speculative": 1}  # Sınıfların boş slotlardan aldığı ağırlıklı pay
+DEFAULT_PRIORITY = "interactive"
+
+class SchedulerTimeout(Exception):
+    """Kuyrukta bekleme süresi dolduğunda fırlatılır"""
+
+class GenerationScheduler:
+    """
+    Upstream üretim çağrılarının önünde duran öncelikli zamanlayıcı.
+    Boşalan slotlar öncelik sınıfları arasında ağırlıklara göre (stride scheduling),
+    sınıf içinde ise markalar (brand_input) arasında sırayla paylaştırılır.
+    """
+
+    def __init__(self, capacity, weights, reserved_interactive=0):
+        self.capacity = max(1, capacity)
+        self.weights = weights
+        self.reserved_interactive = min(reserved_interactive, self.capacity - 1)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queues = {priority: collections.OrderedDict() for priority in weights}  # marka -> bekleyenler
+        self._pass = {priority: 0.0 for priority in weights}
+        self._virtual_time = 0.0
+        self._leases = {}  # iş ID'si -> son geçerlilik zamanı
+        self._stats = {priority: {"granted": 0, "timeouts": 0, "wait_ms_total": 0.0} for priority in weights}
+
+    def _limit(self, priority):
+        """Sınıfın kullanabileceği en fazla slot sayısı"""
+        if priority == "interactive":
+            return self.capacity
+        return self.capacity - self.reserved_interactive
+
+    def _next_waiter(self, active):
+        """Sıradaki bekleyeni ağırlıklı paylara ve marka adaletine göre seçer"""
+        candidates = [p for p, brands in self._queues.items() if brands and active < self._limit(p)]
+        if not candidates:
+            return None
+        priority = min(candidates, key=lambda p: self._pass[p])
+        self._virtual_time = self._pass[priority]
+        self._pass[priority] += 1.0 / self.weights[priority]
+
+        # Markalar arasında round-robin: sıradaki markanın ilk bekleyenini al, markayı sona taşı
+        brands = self._queues[priority]
+        brand, waiters = next(iter(brands.items()))
+        waiter = waiters.popleft()
+        del brands[brand]
+        if waiters:
+            brands[brand] = waiters
+        return waiter
+
+    def _release_locked(self):
+        """Bir slotu boşaltır; bekleyen varsa slotu doğrudan ona devreder"""
+        waiter = self._next_waiter(self._active - 1)
+        if waiter:
+            waiter.set()
+        else:
+            self._active -= 1
+
+    def _reap_expired_leases(self):
+        """Süresi dolan asenkron iş kiralarını serbest bırakır"""
+        now = time.time()
+        for job_id, expires_at in list(self._leases.items()):
+            if expires_at <= now:
+                del self._leases[job_id]
+                logger.warning(f"Üretim slotu kirası süresi doldu, serbest bırakılıyor: {job_id}")
+                self._release_locked()
+
+    def acquire(self, priority, brand, timeout=GENERATION_QUEUE_TIMEOUT):
+        """Bir üretim slotu alır; slot yoksa öncelik sırasına göre bekler"""
+        brand = (brand or "").strip().lower()
+        start = time.time()
+        waiter = threading.Event()
+        with self._lock:
+            self._reap_expired_leases()
+            if self._active < self._limit(priority) and not any(
+                    brands and self._active < self._limit(p) for p, brands in self._queues.items()):
+                self._active += 1
+                self._stats[priority]["granted"] += 1
+                return
+            if not self._queues[priority]:
+                # Boşta kalan sınıf birikmiş kredi ile diğerlerini aç bırakmasın
+                self._pass[priority] = max(self._pass[priority], self._virtual_time)
+            self._queues[priority].setdefault(brand, collections.deque()).append(waiter)
+            logger.info(f"Üretim kuyruğa alındı. Öncelik: {priority}, Marka: {brand or '-'}, Aktif: {self._active}")
+
+        while not waiter.wait(1.0):
+            with self._lock:
+                if waiter.is_set():
+                    break
+                if time.time() - start >= timeout:
+                    waiters = self._queues[priority].get(brand)
+                    if waiters and waiter in waiters:
+                        waiters.remove(waiter)
+                        if not waiters:
+                            del self._queues[priority][brand]
+                    self._stats[priority]["timeouts"] += 1
+                    raise SchedulerTimeout(f"Üretim kuyruğunda bekleme süresi doldu ({timeout:.0f} sn)")
+                self._reap_expired_leases()
+
+        with self._lock:
+            self._stats[priority]["granted"] += 1
+            self._stats[priority]["wait_ms_total"] += (time.time() - start) * 1000
+
+    def release(self):
+        """Alınan slotu bırakır"""
+        with self._lock:
+            self._release_locked()
+
+    def hold(self, job_id, ttl=GENERATION_LEASE_SECONDS):
+        """Asenkron bir iş için alınan slotu iş tamamlanana (veya kira dolana) kadar tutar"""
+        with self._lock:
+            self._leases[str(job_id)] = time.time() + ttl
+
+    def complete(self, job_id):
+        """Asenkron iş tamamlandığında tutulan slotu serbest bırakır"""
+        with self._lock:
+            if self._leases.pop(str(job_id), None) is not None:
+                self._release_locked()
+
+    def snapshot(self):
+        """Zamanlayıcının anlık durumunu döndürür"""
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "reserved_interactive": self.reserved_interactive,
+                "active": self._active,
+                "leases": len(self._leases),
+                "queued": {p: sum(len(w) for w in brands.values()) for p, brands in self._queues.items()},
+                "stats": {p: dict(s) for p, s in self._stats.items()}
+            }
+
+generation_scheduler = GenerationScheduler(GENERATION_CONCURRENCY, PRIORITY_WEIGHTS, GENERATION_RESERVED_INTERACTIVE)
+
+def request_priority():
+    """İsteğin öncelik sınıfını form alanından veya X-Priority başlığından belirler"""
+    priority = (request.form.get('priority') or request.headers.get('X-Priority') or DEFAULT_PRIORITY).strip().lower()
+    if priority not in PRIORITY_WEIGHTS:
+        logger.warning(f"Bilinmeyen öncelik: {priority}, varsayılan {DEFAULT_PRIORITY} kullanılıyor")
+        priority = DEFAULT_PRIORITY
+    return priority
+
+# Idempotency-Key desteği - tekrar gönderilen POST istekleri yeni bir ücretli üretim başlatmasın
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))  # Yanıtların saklanma süresi (saniye)
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "300"))  # Süren orijinal isteğin en fazla bekleneceği süre
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))  # Bellekte tutulacak en fazla yanıt
+_idempotency_store = collections.OrderedDict()  # "yol:anahtar" -> kayıt
+_idempotency_lock = threading.Lock()
+
+def _request_fingerprint():
+    """Aynı anahtarın farklı içerikle kullanılmasını yakalamak için istek içeriğinin özeti"""
+    digest = hashlib.sha256()
+    if request.form:
+        for key, value in sorted(request.form.items(multi=True)):
+            digest.update(f"{key}={value}\n".encode("utf-8"))
+    else:
+        digest.update(request.get_data())
+    return digest.hexdigest()
+
+def idempotent(view):
+    """
+    Idempotency-Key başlığı olan istekler için ilk yanıtı saklar ve tekrarlarda aynen döndürür.
+    Orijinal istek hâlâ sürüyorsa tekrar eden istek onun sonucunu bekler.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({"error": f"{IDEMPOTENCY_HEADER} en fazla 255 karakter olabilir"}), 400
+
+        store_key = f"{request.path}:{key}"
+        fingerprint = _request_fingerprint()
+        now = time.time()
+        with _idempotency_lock:
+            while _idempotency_store:
+                oldest_key, oldest = next(iter(_idempotency_store.items()))
+                if now - oldest["created_at"] < IDEMPOTENCY_TTL:
+                    break
+                _idempotency_store.pop(oldest_key)
+            if len(_idempotency_store) >= IDEMPOTENCY_CACHE_SIZE:
+                # Sınır aşılırsa en eski biten yanıtları at; süren istekler bekleyenleri için kalır
+                excess = len(_idempotency_store) - IDEMPOTENCY_CACHE_SIZE + 1
+                finished_keys = itertools.islice((k for k, e in _idempotency_store.items() if e["event"].is_set()), excess)
+                for finished_key in list(finished_keys):
+                    _idempotency_store.pop(finished_key)
+            entry = _idempotency_store.get(store_key)
+            is_owner = entry is None
+            if is_owner:
+                entry = {"fingerprint": fingerprint, "event": threading.Event(), "response": None, "created_at": now}
+                _idempotency_store[store_key] = entry
+
+        if not is_owner:
+            if entry["fingerprint"] != fingerprint:
+                return jsonify({"error": f"{IDEMPOTENCY_HEADER} farklı bir istek için kullanılmış"}), 422
+            logger.info(f"Tekrarlanan istek ({key}), orijinal sonuç bekleniyor/döndürülüyor")
+            with trace_span("idempotency.wait", key=key):
+                finished = entry["event"].wait(IDEMPOTENCY_WAIT_TIMEOUT)
+            if not finished or entry["response"] is None:
+                return jsonify({"error": "Orijinal istek henüz tamamlanmadı, lütfen daha sonra tekrar deneyin"}), 409, {"Retry-After": "5"}
+            body, status, headers = entry["response"]
+            response = app.response_class(body, status=status, headers=headers)
+            response.headers["Idempotent-Replayed"] = "true"
+            return response
+
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except Exception:
+            with _idempotency_lock:
+                _idempotency_store.pop(store_key, None)
+            entry["event"].set()
+            raise
+
+        entry["response"] = (
+            response.get_data(),
+            response.status_code,
+            {name: value for name, value in response.headers.items() if name in ("Content-Type", "Location", "Retry-After")}
+        )
+        if response.status_code >= 500 or response.status_code == 429:
+            # Geçici hatalar saklanmaz; bekleyenler bu yanıtı alır, sonraki deneme yeniden çalışır
+            with _idempotency_lock:
+                _idempotency_store.pop(store_key, None)
+        entry["event"].set()
+        return response
+    return wrapper
+
+# Astria AI dokümantasyonuna göre boyutlar - 8'in katları olmalıdır
+ASPECT_RATIO_SIZES = {
+    "1:1": (1024, 1024),   # Kare format
+    "4:5": (1024, 1280),   # Instagram post formatı
+    "16:9": (1280, 720),   # Yatay video/web formatı
+    "9:16": (720, 1280)    # Dikey story formatı
+}
+
+# Tek üretimden tüm en-boy oranlarını türetme modu
+IMAGE_VARIANT_MODE = os.getenv("IMAGE_VARIANT_MODE", "off").lower()  # "derive" ise varsayılan olarak açık
+MASTER_IMAGE_SIZE = (1280, 1280)  # Tüm varyantların kırpılabileceği ana çözünürlük
+MASTER_IMAGE_TTL = int(os.getenv("MASTER_IMAGE_TTL", "86400"))  # Ana görsel kaydının geçerlilik süresi (saniye)
+VARIANT_CACHE_SIZE = int(os.getenv("VARIANT_CACHE_SIZE", "128"))  # Bellekte tutulacak varyant sayısı
+
+_master_lock = threading.Lock()
+_master_images = collections.OrderedDict()  # prompt anahtarı -> {"prompt_id", "image_urls", "created_at"}
+_master_prompt_ids = {}  # prompt_id -> prompt anahtarı
+_variant_cache = collections.OrderedDict()  # (image_url, aspect_ratio, fit) -> JPEG baytları
+
+def derive_variants_requested(params, aspect_ratio):
+    """İsteğin ana görselden varyant türetme modunda çalışıp çalışmayacağını belirler"""
+    default_derive = 'true' if IMAGE_VARIANT_MODE == 'derive' else 'false'
+    return PIL_AVAILABLE and aspect_ratio in ASPECT_RATIO_SIZES and \
+        str(params.get('derive_variants', default_derive)).lower() == 'true'
+
+def _master_key(prompt):
+    """Aynı ürün promptunu farklı oranlar için aynı anahtara indirger"""
+    return " ".join(prompt.lower().split())
+
+def lookup_master_image(prompt):
+    """Prompt için daha önce başlatılmış ana görsel üretimini döndürür"""
+    with _master_lock:
+        entry = _master_images.get(_master_key(prompt))
+        if entry and time.time() - entry["created_at"] > MASTER_IMAGE_TTL:
+            _master_images.pop(_master_key(prompt))
+            _master_prompt_ids.pop(str(entry["prompt_id"]), None)
+            return None
+        return dict(entry) if entry else None
+
+def register_master_image(prompt, prompt_id, image_urls=None):
+    """Ana görsel üretimini kaydeder"""
+    key = _master_key(prompt)
+    with _master_lock:
+        _master_images[key] = {"prompt_id": prompt_id, "image_urls": image_urls or [], "created_at": time.time()}
+        _master_prompt_ids[str(prompt_id)] = key
+        while len(_master_images) > 10000:
+            _, old = _master_images.popitem(last=False)
+            _master_prompt_ids.pop(str(old["prompt_id"]), None)
+
+def unregister_master_image(prompt_id):
+    """Başarısız ya da iptal edilen ana görsel üretimini kayıttan çıkarır"""
+    with _master_lock:
+        key = _master_prompt_ids.pop(str(prompt_id), None)
+        entry = _master_images.get(key)
+        if entry and str(entry["prompt_id"]) == str(prompt_id):
+            _master_images.pop(key)
+
+def complete_master_image(prompt_id, image_urls):
+    """Ana görsel hazır olduğunda URL'lerini kaydeder; prompt_id bir ana görsel değilse False döner"""
+    with _master_lock:
+        key = _master_prompt_ids.get(str(prompt_id))
+        if not key or key not in _master_images:
+            return False
+        _master_images[key]["image_urls"] = list(image_urls)
+        return True
+
+def is_master_image_url(image_url):
+    """URL'nin bu sunucunun başlattığı bir ana görsele ait olup olmadığını kontrol eder"""
+    with _master_lock:
+        return any(image_url in entry["image_urls"] for entry in _master_images.values())
+
+def variant_url(image_url, aspect_ratio):
+    """Ana görselden türetilecek varyantın adresini üretir"""
+    return url_for('image_variant', image_url=image_url, aspect_ratio=aspect_ratio)
+
+def smart_crop_box(img, target_ratio):
+    """
+    Kenar enerjisi en yüksek bölgeyi içine alan, hedef orandaki kırpma kutusunu bulur.
+    Görüntü küçültülüp kenarları çıkarılır, pencere tek eksende kaydırılarak
+    hafif merkez ağırlıklı toplam enerjisi en yüksek konum seçilir.
+    """
+    width, height = img.size
+    if abs(width / height - target_ratio) < 0.01:
+        return (0, 0, width, height)
+
+    scale = 256 / max(width, height)
+    small = img.convert("L").resize((max(1, int(width * scale)), max(1, int(height * scale))))
+    edges = small.filter(ImageFilter.FIND_EDGES)
+    sw, sh = edges.size
+    pixels = edges.load()
+
+    horizontal = width / height > target_ratio  # Genişlik kırpılacak mı?
+    if horizontal:
+        profile = [sum(pixels[x, y] for y in range(sh)) for x in range(sw)]
+        window = max(1, int(round(sh * target_ratio)))
+    else:
+        profile = [sum(pixels[x, y] for x in range(sw)) for y in range(sh)]
+        window = max(1, int(round(sw / target_ratio)))
+
+    length = len(profile)
+    window = min(window, length)
+    prefix = [0]
+    for value in profile:
+        prefix.append(prefix[-1] + value)
+    total = prefix[-1] or 1
+
+    best_offset, best_score = 0, None
+    for offset in range(length - window + 1):
+        energy = (prefix[offset + window] - prefix[offset]) / total
+        center_bias = 1 - abs((offset + window / 2) / length - 0.5) * 0.2
+        score = energy * center_bias
+        if best_score is None or score > best_score:
+            best_offset, best_score = offset, score
+
+    if horizontal:
+        crop_width = int(round(height * target_ratio))
+        left = min(int(round(best_offset / scale)), width - crop_width)
+        return (left, 0, left + crop_width, height)
+    crop_height = int(round(width / target_ratio))
+    top = min(int(round(best_offset / scale)), height - crop_height)
+    return (0, top, width, top + crop_height)
+
+def render_variant(master, aspect_ratio, fit="crop"):
+    """Ana görselden istenen en-boy oranında varyant üretir (kırpma veya bulanık arka planla doldurma)"""
+    target_w, target_h = ASPECT_RATIO_SIZES[aspect_ratio]
+    master = master.convert("RGB")
+
+    if fit == "pad":
+        # Görselin tamamını koru, boşlukları bulanık bir arka planla doldur
+        background = ImageOps.fit(master, (target_w, target_h)).filter(ImageFilter.GaussianBlur(30))
+        foreground = ImageOps.contain(master, (target_w, target_h), Image.LANCZOS)
+        background.paste(foreground, ((target_w - foreground.width) // 2, (target_h - foreground.height) // 2))
+        return background
+
+    box = smart_crop_box(master, target_w / target_h)
+    return master.crop(box).resize((target_w, target_h), Image.LANCZOS)
+
+# Algısal hash ile neredeyse aynı görsellerin tespiti
+DUPLICATE_MODE = os.getenv("DUPLICATE_MODE", "flag").lower()  # "off", "flag" (işaretle) veya "suppress" (gizle)
+PHASH_THRESHOLD = int(os.getenv("PHASH_THRESHOLD", "6"))  # 64 bitlik hash'ler arası en fazla Hamming mesafesi
+DUPLICATE_DOWNLOAD_TIMEOUT = 30  # Hash'lenecek görseli indirmenin en uzun süresi (saniye)
+PHASH_INDEX_FILE = os.getenv("PHASH_INDEX_FILE")  # Hash indeksinin JSONL olarak saklanacağı dosya
+
+# 32 noktalı DCT-II katsayıları (yalnızca ilk 8 frekans gerekli)
+_DCT_TABLE = [[math.cos((2 * x + 1) * u * math.pi / 64) for x in range(32)] for u in range(8)]
+
+def perceptual_hash(img) -> int:
+    """
+    Görselin 64 bitlik algısal hash'ini (pHash) hesaplar.
+    32x32 gri tonlamalı görüntünün düşük frekanslı 8x8 DCT katsayıları medyana göre bitlere çevrilir.
+    """
+    pixels = list(img.convert("L").resize((32, 32), Image.LANCZOS).getdata())
+    rows = [pixels[y * 32:(y + 1) * 32] for y in range(32)]
+    row_dct = [[sum(row[x] * _DCT_TABLE[u][x] for x in range(32)) for u in range(8)] for row in rows]
+    coefficients = [sum(row_dct[y][u] * _DCT_TABLE[v][y] for y in range(32)) for v in range(8) for u in range(8)]
+
+    # DC bileşeni medyanı bozmasın
+    median = sorted(coefficients[1:])[31]
+    value = 0
+    for coefficient in coefficients:
+        value = (value << 1) | (1 if coefficient > median else 0)
+    return value
+
+def hamming_distance(a: int, b: int) -> int:
+    """İki hash arasındaki farklı bit sayısı"""
+    return bin(a ^ b).count("1")
+
+class ImageHashIndex:
+    """
+    64 bitlik hash'ler için çoklu indeksli hash tablosu (multi-index hashing).
+    Hash 4 adet 16 bitlik parçaya bölünür; mesafesi T'den küçük iki hash'in en az bir parçası
+    en fazla T // 4 bit farklıdır. Sorgu yalnızca bu komşu kovaları tarar.
+    """
+
+    def __init__(self, bits=64, chunks=4):
+        self.chunks = chunks
+        self.chunk_bits = bits // chunks
+        self._mask = (1 << self.chunk_bits) - 1
+        self._lock = threading.Lock()
+        self._tables = [collections.defaultdict(list) for _ in range(chunks)]
+        self._keys = []
+        self._hashes = []
+        self._ids = {}  # anahtar -> sıra numarası
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _split(self, value):
+        return [(value >> (i * self.chunk_bits)) & self._mask for i in range(self.chunks)]
+
+    def _neighbors(self, chunk, radius):
+        """Parçaya en fazla radius bit uzaklıktaki tüm değerleri üretir"""
+        yield chunk
+        for distance in range(1, radius + 1):
+            for positions in itertools.combinations(range(self.chunk_bits), distance):
+                flipped = chunk
+                for position in positions:
+                    flipped ^= 1 << position
+                yield flipped
+
+    def get(self, key):
+        """Anahtarın kayıtlı hash'ini döndürür"""
+        with self._lock:
+            index = self._ids.get(key)
+            return self._hashes[index] if index is not None else None
+
+    def add(self, key, value):
+        """Hash'i indekse ekler"""
+        with self._lock:
+            if key in self._ids:
+                return
+            index = len(self._keys)
+            self._ids[key] = index
+            self._keys.append(key)
+            self._hashes.append(value)
+            for table, chunk in zip(self._tables, self._split(value)):
+                table[chunk].append(index)
+
+    def query(self, value, threshold):
+        """Hamming mesafesi eşik değerinin altındaki kayıtları yakından uzağa sıralı döndürür"""
+        radius = threshold // self.chunks
+        seen = set()
+        results = []
+        with self._lock:
+            for table, chunk in zip(self._tables, self._split(value)):
+                for probe in self._neighbors(chunk, radius):
+                    for index in table.get(probe, ()):
+                        if index in seen:
+                            continue
+                        seen.add(index)
+                        distance = hamming_distance(self._hashes[index], value)
+                        if distance <= threshold:
+                            results.append((self._keys[index], distance))
+        return sorted(results, key=lambda r: r[1])
+
+image_hash_index = ImageHashIndex()
+_duplicate_results = {}  # görsel URL'si -> {"hash", "duplicate_of", "distance"}
+_duplicate_lock = threading.Lock()
+_hash_pending = {}  # hash'lenmekte olan URL -> future (aynı görsel iki kez indirilmesin)
+_hash_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="phash")
+
+if PHASH_INDEX_FILE and os.path.exists(PHASH_INDEX_FILE):
+    try:
+        with open(PHASH_INDEX_FILE) as f:
+            for line in f:
+                record = json.loads(line)
+                image_hash_index.add(record["url"], int(record["hash"], 16))
+        logger.info(f"Algısal hash indeksi yüklendi: {len(image_hash_index)} görsel")
+    except Exception as e:
+        logger.warning(f"Algısal hash indeksi yüklenemedi: {str(e)}")
+
+def check_duplicate(image_url, timeout=DUPLICATE_DOWNLOAD_TIMEOUT):
+    """Görseli indirip hash'ler, indekste neredeyse aynısını arar ve indekse ekler"""
+    with _duplicate_lock:
+        if image_url in _duplicate_results:
+            return _duplicate_results[image_url]
+
+    with trace_span("image.download", purpose="phash") as span:
+        response = requests.get(image_url, timeout=timeout)
+        mark_http_status(span, response.status_code)
+    response.raise_for_status()
+    value = perceptual_hash(Image.open(io.BytesIO(response.content)))
+
+    matches = [(url, d) for url, d in image_hash_index.query(value, PHASH_THRESHOLD) if url != image_url]
+    image_hash_index.add(image_url, value)
+    if PHASH_INDEX_FILE:
+        try:
+            with _duplicate_lock, open(PHASH_INDEX_FILE, "a") as f:
+                f.write(json.dumps({"url": image_url, "hash": f"{value:016x}"}) + "\n")
+        except Exception as e:
+            logger.warning(f"Algısal hash indeks dosyasına yazılamadı: {str(e)}")
+
+    result = {
+        "hash": f"{value:016x}",
+        "duplicate_of": matches[0][0] if matches else None,
+        "distance": matches[0][1] if matches else None
+    }
+    if matches:
+        logger.info(f"Neredeyse aynı görsel bulundu: {image_url} ~ {matches[0][0]} (mesafe: {matches[0][1]})")
+    with _duplicate_lock:
+        _duplicate_results[image_url] = result
+        while len(_duplicate_results) > 100000:
+            _duplicate_results.pop(next(iter(_duplicate_results)))
+    return result
+
+def _start_duplicate_check(image_url, timeout=DUPLICATE_DOWNLOAD_TIMEOUT):
+    """Görsel için arka planda hash başlatır (sürüyorsa aynı işi döndürür); sonuç biliniyorsa None döner"""
+    with _duplicate_lock:
+        if image_url in _duplicate_results:
+            return None
+        future = _hash_pending.get(image_url)
+        if future is None:
+            future = _hash_pending[image_url] = _hash_executor.submit(
+                contextvars.copy_context().run, _check_duplicate_quietly, image_url, timeout)
+    return future
+
+def _duplicate_results_for(image_urls):
+    with _duplicate_lock:
+        return {u: _duplicate_results[u] for u in image_urls if u in _duplicate_results}
+
+def known_duplicates(image_urls):
+    """
+    Bilinen tekrar bilgisini beklemeden döndürür; hash'lenmemiş görseller arka planda hash'lenir.
+    İkinci değer hash'i süren görsel olup olmadığıdır; sonuç sonraki durum yanıtlarında gelir.
+    """
+    pending = [image_url for image_url in image_urls if _start_duplicate_check(image_url)]
+    return _duplicate_results_for(image_urls), bool(pending)
+
+def _check_duplicate_quietly(image_url, timeout=DUPLICATE_DOWNLOAD_TIMEOUT):
+    """Arka plan görevi: hatayı loglayıp yutar"""
+    try:
+        check_duplicate(image_url, timeout)
+    except Exception as e:
+        logger.warning(f"Görsel hash'lenemedi ({image_url}): {str(e)}")
+    finally:
+        with _duplicate_lock:
+            _hash_pending.pop(image_url, None)
+
+def filter_duplicates(image_urls):
+    """Görselleri paralel hash'ler ve önceden üretilmiş olanların neredeyse aynısını listeden çıkarır"""
+    # İndirmeler isteğin kalan bütçesinin yarısıyla sınırlı; zamanında hash'lenemeyen görseller tutulur
+    remaining = remaining_time()
+    budget = DUPLICATE_DOWNLOAD_TIMEOUT if remaining is None else min(DUPLICATE_DOWNLOAD_TIMEOUT, max(remaining, 0) / 2)
+    futures = [f for f in (_start_duplicate_check(u, budget or DUPLICATE_DOWNLOAD_TIMEOUT) for u in image_urls) if f]
+    if futures and budget:
+        concurrent.futures.wait(futures, timeout=budget)
+
+    results = _duplicate_results_for(image_urls)
+    kept, duplicates = [], {}
+    for image_url in image_urls:
+        result = results.get(image_url)
+        if result and result["duplicate_of"]:
+            duplicates[image_url] = result
+        else:
+            kept.append(image_url)
+    if not kept:
+        # Hepsi tekrar ise kullanıcıyı sonuçsuz bırakma, yalnızca işaretle
+        return list(image_urls), duplicates
+    return kept, duplicates
+
+# Ürün sayfalarından görsel çıkarma yapılandırması
+EXTRACT_CONCURRENCY = int(os.getenv("EXTRACT_CONCURRENCY", "8"))  # Aynı anda indirilecek sayfa sayısı
+EXTRACT_CACHE_TTL = int(os.getenv("EXTRACT_CACHE_TTL", "600"))  # Sayfa sonuçlarının önbellekte kalma süresi (saniye)
+EXTRACT_MAX_URLS = int(os.getenv("EXTRACT_MAX_URLS", "50"))  # Tek istekte işlenecek en fazla sayfa
+EXTRACT_MAX_BYTES = 5 * 1024 * 1024  # Sayfa başına okunacak en fazla bayt
+SCRAPE_DO_TOKEN = os.getenv("SCRAPE_DO_TOKEN")  # Varsa sayfalar Scrape.do üzerinden çekilir
+EXTRACT_ALLOW_PRIVATE = os.getenv("EXTRACT_ALLOW_PRIVATE", "false").lower() == "true"  # Yerel/özel ağ adreslerine izin ver (yalnızca test için)
+EXTRACT_MAX_REDIRECTS = 5  # Sayfa başına izlenecek en fazla yönlendirme
+TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "_ga")
+
+# Sayfa indirmeleri için ortak bağlantı havuzu
+extract_session = requests.Session()
+extract_session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=EXTRACT_CONCURRENCY, pool_maxsize=EXTRACT_CONCURRENCY))
+extract_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=EXTRACT_CONCURRENCY, pool_maxsize=EXTRACT_CONCURRENCY))
+extract_session.headers.update({"User-Agent": "Mozilla/5.0 (compatible; HepsiburadaContentGen/1.0)"})
+_extract_executor = concurrent.futures.ThreadPoolExecutor(max_workers=EXTRACT_CONCURRENCY, thread_name_prefix="extract")
+_extract_cache = collections.OrderedDict()  # sayfa URL'si -> (zaman, görsel URL'leri)
+_extract_cache_lock = threading.Lock()
+
+def canonical_image_url(raw_url, base_url):
+    """Görsel URL'sini karşılaştırılabilir kanonik biçime getirir; geçersizse None döner"""
+    raw_url = (raw_url or "").strip()
+    if not raw_url or raw_url.startswith("data:"):
+        return None
+    parsed = urllib.parse.urlsplit(urllib.parse.urljoin(base_url, raw_url))
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return None
+
+    netloc = parsed.hostname.lower()
+    if parsed.port and parsed.port != {"http": 80, "https": 443}[parsed.scheme]:
+        netloc = f"{netloc}:{parsed.port}"
+    query = sorted((k, v) for k, v in urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+                   if not k.lower().startswith(TRACKING_PARAMS))
+    return urllib.parse.urlunsplit((parsed.scheme, netloc, parsed.path or "/", urllib.parse.urlencode(query), ""))
+
+class ImageLinkParser(html.parser.HTMLParser):
+    """HTML'i parça parça okuyarak ürün görseli adaylarını toplar; DOM ağacı kurmaz"""
+
+    IMAGE_ATTRIBUTES = ("src", "data-src", "data-original", "data-lazy-src", "data-zoom-image")
+
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.image_urls = []
+        self._seen = set()
+
+    def _add(self, raw_url):
+        url = canonical_image_url(raw_url, self.base_url)
+        if url and url not in self._seen:
+            self._seen.add(url)
+            self.image_urls.append(url)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "base" and attrs.get("href"):
+            self.base_url = urllib.parse.urljoin(self.base_url, attrs["href"])
+        elif tag == "meta" and (attrs.get("property") or attrs.get("name")) in ("og:image", "og:image:url", "twitter:image"):
+            self._add(attrs.get("content"))
+        elif tag == "link" and attrs.get("rel") == "image_src":
+            self._add(attrs.get("href"))
+        elif tag in ("img", "source"):
+            for name in self.IMAGE_ATTRIBUTES:
+                if attrs.get(name):
+                    self._add(attrs[name])
+            for name in ("srcset", "data-srcset"):
+                # srcset içindeki en büyük (son) adayı al
+                candidates = [c.strip().split(" ")[0] for c in (attrs.get(name) or "").split(",") if c.strip()]
+                if candidates:
+                    self._add(candidates[-1])
+
+class UnsafeURLError(ValueError):
+    """Sunucu tarafında indirilmesine izin verilmeyen (ör. iç ağdaki) adresler için fırlatılır"""
+
+def ensure_public_url(url):
+    """Adresin http(s) olduğunu ve yalnızca genel internet IP'lerine çözümlendiğini doğrular (SSRF koruması)"""
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise UnsafeURLError(f"Yalnızca http ve https adresleri desteklenir: {url}")
+    if EXTRACT_ALLOW_PRIVATE:
+        return
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(parsed.hostname, port, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, ValueError) as e:
+        raise UnsafeURLError(f"Adres çözümlenemedi ({parsed.hostname}): {str(e)}")
+    for address in addresses:
+        # Loopback, özel ağ, link-local (169.254.169.254 dahil) ve ayrılmış adresler genel değildir
+        if not ipaddress.ip_address(address.split("%")[0]).is_global:
+            raise UnsafeURLError(f"İç ağ adreslerine erişime izin verilmiyor: {parsed.hostname}")
+
+def fetch_page_images(page_url):
+    """Sayfayı havuzdaki bağlantıyla akış halinde indirir ve görsel URL'lerini çıkarır"""
+    now = time.time()
+    with _extract_cache_lock:
+        cached = _extract_cache.get(page_url)
+        if cached and now - cached[0] < EXTRACT_CACHE_TTL:
+            _extract_cache.move_to_end(page_url)
+            return cached[1]
+
+    fetch_url, params = page_url, None
+    if SCRAPE_DO_TOKEN:
+        fetch_url, params = "https://api.scrape.do", {"token": SCRAPE_DO_TOKEN, "url": page_url}
+
+    ensure_public_url(page_url)
+    parser = ImageLinkParser(page_url)
+    with trace_span("page.fetch", url=page_url) as span:
+        # Yönlendirmeleri elle izle ki her adımın hedefi de doğrulansın
+        for _ in range(EXTRACT_MAX_REDIRECTS + 1):
+            ensure_public_url(fetch_url)
+            response = extract_session.get(fetch_url, params=params, stream=True, timeout=(5, 20), allow_redirects=False)
+            if not response.is_redirect:
+                break
+            fetch_url, params = urllib.parse.urljoin(response.url, response.headers["Location"]), None
+            response.close()
+        else:
+            raise UnsafeURLError(f"Çok fazla yönlendirme: {page_url}")
+        with response:
+            mark_http_status(span, response.status_code)
+            response.raise_for_status()
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+            received = 0
+            for chunk in response.iter_content(chunk_size=16384):
+                parser.feed(decoder.decode(chunk))
+                received += len(chunk)
+                if received >= EXTRACT_MAX_BYTES:
+                    logger.warning(f"Sayfa boyut sınırına ulaşıldı, kalan kısım okunmuyor: {page_url}")
+                    break
+            parser.feed(decoder.decode(b"", final=True))
+            parser.close()
+        span["attributes"]["images"] = len(parser.image_urls)
+
+    with _extract_cache_lock:
+        _extract_cache[page_url] = (time.time(), parser.image_urls)
+        while len(_extract_cache) > 1000:
+            _extract_cache.popitem(last=False)
+    return parser.image_urls
+
+# Prompt üretimi için gecikme farkındalıklı model yönlendirici
+# Biçim: "model:max_tokens,model:max_tokens" - tercih sırasına göre (ilk model birincil)
+PROMPT_MODELS = os.getenv("PROMPT_MODELS", "gpt-4o:1000,gpt-4o-mini:1000")
+PROMPT_LATENCY_SLO = float(os.getenv("PROMPT_LATENCY_SLO", "10"))  # Varsayılan gecikme hedefi (saniye)
+MODEL_STATS_WINDOW = 300  # Gecikme/hata istatistiklerinin dikkate alındığı süre (saniye)
+MODEL_STATS_SAMPLES = 50  # Model başına saklanan son ölçüm sayısı
+
+class ModelRouter:
+    """
+    Yapılandırılmış modeller arasından, isteğin gecikme hedefini (SLO) karşılaması beklenen
+    en çok tercih edilen modeli seçer. Her modelin son ölçümlerinden p90 gecikme ve hata oranı
+    hesaplanır; yakın zamanda ölçümü olmayan model iyimser kabul edilir, böylece yavaşlayan
+    birincil model pencere dolduğunda yeniden denenir.
+    """
+
+    def __init__(self, spec):
+        self.candidates = []
+        for item in spec.split(","):
+            model, _, max_tokens = item.strip().partition(":")
+            if model:
+                self.candidates.append({"model": model, "max_tokens": int(max_tokens or 1000)})
+        self._lock = threading.Lock()
+        self._samples = {c["model"]: collections.deque(maxlen=MODEL_STATS_SAMPLES) for c in self.candidates}
+
+    def record(self, model, latency, ok):
+        """Bir çağrının gecikmesini ve başarısını kaydeder"""
+        with self._lock:
+            self._samples.setdefault(model, collections.deque(maxlen=MODEL_STATS_SAMPLES)).append((time.time(), latency, ok))
+
+    def stats(self, model):
+        """Modelin pencere içindeki p90 gecikmesi, hata oranı ve ölçüm sayısı"""
+        cutoff = time.time() - MODEL_STATS_WINDOW
+        with self._lock:
+            recent = [(latency, ok) for ts, latency, ok in self._samples.get(model, ()) if ts >= cutoff]
+        if not recent:
+            return {"p90": None, "error_rate": 0.0, "samples": 0}
+        latencies = sorted(latency for latency, ok in recent if ok)
+        p90 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))] if latencies else None
+        return {
+            "p90": p90,
+            "error_rate": sum(1 for _, ok in recent if not ok) / len(recent),
+            "samples": len(recent)
+        }
+
+    def plan(self, slo):
+        """Denenecek modellerin sırasını döndürür: hedefi karşılayanlar tercih sırasıyla, sonra en hızlılar"""
+        scored = []
+        for index, candidate in enumerate(self.candidates):
+            stats = self.stats(candidate["model"])
+            healthy = stats["error_rate"] < 0.5
+            fits = healthy and (stats["p90"] is None or stats["p90"] <= slo)
+            if stats["p90"] is not None:
+                estimate = stats["p90"]
+            else:
+                # Başarılı ölçümü olmayan sağlıksız model, yavaş ama sağlıklı modellerin önüne geçmesin
+                estimate = 0.0 if healthy else math.inf
+            scored.append((not fits, estimate if not fits else index, index, candidate))
+        return [candidate for *_, candidate in sorted(scored, key=lambda s: s[:3])]
+
+    def complete(self, messages, slo=PROMPT_LATENCY_SLO, operation="chat", max_tokens=None, **kwargs):
+        """
+        Seçilen modelle chat completion çağrısı yapar; model hata verir veya hedef süreyi aşarsa
+        sıradaki modele düşer. (yanıt, model adı) döndürür.
+        """
+        plan = self.plan(slo)
+        last_error = None
+        for attempt, candidate in enumerate(plan):
+            model = candidate["model"]
+            budget = min(max_tokens, candidate["max_tokens"]) if max_tokens else candidate["max_tokens"]
+            # Son aday dışında, hedef süreyi aşan çağrı beklenmez; istemcinin kendi yeniden denemeleri de kapatılır
+            timeout = slo if attempt < len(plan) - 1 else None
+            start = time.perf_counter()
+            try:
+                with trace_span("openai.chat.completions", model=model, operation=operation, max_tokens=budget, attempt=attempt):
+                    api = client.with_options(max_retries=0, timeout=timeout) if timeout else client
+                    response = api.chat.completions.create(**dict(kwargs, model=model, messages=messages, max_tokens=budget))
+                self.record(model, time.perf_counter() - start, True)
+                capture_upstream("openai", model, time.perf_counter() - start,
+                                 body={"content": response.choices[0].message.content})
+                logger.info(f"Model yönlendirici: {operation} isteği {model} ile tamamlandı ({time.perf_counter() - start:.2f} sn)")
+                return response, model
+            except Exception as e:
+                self.record(model, time.perf_counter() - start, False)
+                capture_upstream("openai", model, time.perf_counter() - start, error=str(e))
+                last_error = e
+                logger.warning(f"Model yönlendirici: {model} başarısız oldu ({str(e)}), sıradaki model deneniyor")
+        raise last_error or ValueError("Yapılandırılmış model bulunamadı")
+
+    def snapshot(self):
+        """Modellerin anlık istatistiklerini döndürür"""
+        return {c["model"]: dict(self.stats(c["model"]), max_tokens=c["max_tokens"]) for c in self.candidates}
+
+model_router = ModelRouter(PROMPT_MODELS)
+
+def request_latency_slo(data):
+    """İsteğin gecikme hedefini gövdedeki latency_slo alanından veya X-Latency-SLO başlığından alır"""
+    value = (data or {}).get("latency_slo") or request.headers.get("X-Latency-SLO")
+    try:
+        return max(1.0, float(value)) if value else PROMPT_LATENCY_SLO
+    except (TypeError, ValueError):
+        return PROMPT_LATENCY_SLO
+
+def build_astria_prompt_data(prompt, aspect_ratio, derive_variants=False):
+    """Astria AI prompt isteğinin form verisini ve görsel boyutlarını hazırlar"""
+    # Astria AI dokümantasyonuna göre boyutları ayarla
+    if derive_variants:
+        width, height = MASTER_IMAGE_SIZE
+    elif aspect_ratio in ASPECT_RATIO_SIZES:
+        width, height = ASPECT_RATIO_SIZES[aspect_ratio]
+    else:
+        # Varsayılan olarak 1:1 kullan
+        width, height = ASPECT_RATIO_SIZES["1:1"]
+        logger.warning(f"Bilinmeyen aspect ratio: {aspect_ratio}, varsayılan 1:1 kullanılıyor")
+    
+    # Prompt'a aspect ratio bilgisini ekle ve optimize et
+    # Astria AI dokümantasyonuna göre prompt'u düzenle
+    aspect_ratio_prompt = ""
+    if derive_variants:
+        # Ana görsel her orana kırpılabilmeli: konu merkezde, kenarlarda boşluk
+        aspect_ratio_prompt = "centered composition, main subject in the middle with generous margins on all sides"
+    elif aspect_ratio == "1:1":
+        aspect_ratio_prompt = "square format, 1:1 aspect ratio"
+    elif aspect_ratio == "4:5":
+        aspect_ratio_prompt = "portrait format, 4:5 aspect ratio, vertical composition"
+    elif aspect_ratio == "16:9":
+        aspect_ratio_prompt = "landscape format, 16:9 aspect ratio, horizontal composition"
+    elif aspect_ratio == "9:16":
+        aspect_ratio_prompt = "vertical format, 9:16 aspect ratio, portrait composition"
+    
+    enhanced_prompt = f"{prompt}, {aspect_ratio_prompt}, high quality, detailed"
+    logger.info(f"Geliştirilmiş prompt: {enhanced_prompt[:100]}...")
+    
+    # Astria AI API isteği için form data hazırla
+    # Dokümantasyona göre parametreleri ayarla
+    data = {
+        'prompt[text]': enhanced_prompt,
+        'prompt[w]': str(width),
+        'prompt[h]': str(height),
+        'prompt[num_inference_steps]': "50",  # Daha yüksek kalite için 50 adım
+        'prompt[guidance_scale]': "7.5",      # Prompt'a uyum için 7.5 değeri
+        'prompt[seed]': "-1",                 # Rastgele seed
+        'prompt[lora_scale]': "0.8"           # LoRA ağırlığı
+    }
+    return data, width, height
+
+# Önerilen promptlar için spekülatif görsel üretimi
+SPECULATIVE_GENERATION = os.getenv("SPECULATIVE_GENERATION", "off").lower()  # "off", "opt-in" (istek bazında) veya "on"
+SPECULATIVE_BUDGET = int(os.getenv("SPECULATIVE_BUDGET", "4"))  # Bir prompt seti için en fazla spekülatif üretim
+SPECULATIVE_KEEP = int(os.getenv("SPECULATIVE_KEEP", "0"))  # Seçim sonrası iptal edilmeden tutulacak diğer üretim sayısı
+SPECULATIVE_TTL = int(os.getenv("SPECULATIVE_TTL", "600"))  # Spekülatif üretimin seçilebileceği süre (saniye)
+SPECULATIVE_MAX_OUTSTANDING = int(os.getenv("SPECULATIVE_MAX_OUTSTANDING", "4"))  # Aynı anda seçilmeyi bekleyen en fazla spekülatif üretim
+ASTRIA_FLUX_MODEL_ID = "1504944"  # Flux1.dev from the gallery
+
+_speculative_lock = threading.Lock()
+_speculative_jobs = {}  # (prompt anahtarı, aspect ratio) -> kayıt
+_speculative_groups = {}  # grup ID'si -> kayıt anahtarları
+_speculative_submitting = 0  # Şu anda Astria'ya gönderilmekte olan spekülatif üretim sayısı
+_speculative_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative")
+
+def speculation_requested(data):
+    """/generate-prompt isteği için spekülatif üretimin yapılıp yapılmayacağını belirler"""
+    if SPECULATIVE_GENERATION == "on":
+        return True
+    return SPECULATIVE_GENERATION == "opt-in" and bool((data or {}).get("speculative"))
+
+def cancel_astria_prompt(prompt_id):
+    """Astria'daki bir üretimi iptal etmeyi dener ve tuttuğu üretim slotunu bırakır"""
+    generation_scheduler.complete(prompt_id)
+    unregister_master_image(prompt_id)
+    try:
+        with trace_span("astria.prompt.delete", prompt_id=prompt_id) as span:
+            response = requests.delete(
+                f"https://api.astria.ai/tunes/{ASTRIA_FLUX_MODEL_ID}/prompts/{prompt_id}",
+                headers={"Authorization": f"Bearer {os.getenv('ASTRIA_API_KEY')}"},
+                timeout=10
+            )
+            mark_http_status(span, response.status_code)
+        logger.info(f"Spekülatif üretim iptal edildi: {prompt_id} ({response.status_code})")
+    except Exception as e:
+        logger.warning(f"Spekülatif üretim iptal edilemedi ({prompt_id}): {str(e)}")
+
+def _submit_speculative(key, brand_input):
+    """Arka plan görevi: tek bir önerilen prompt için düşük öncelikli Astria üretimi başlatır"""
+    with _speculative_lock:
+        job = _speculative_jobs.get(key)
+        if not job or job["state"] != "pending":
+            return
+
+    global _speculative_submitting
+    prompt, aspect_ratio, derive = job["prompt"], key[1], job["derive"]
+    with _speculative_lock:
+        outstanding = _speculative_submitting + sum(1 for j in _speculative_jobs.values() if j["state"] == "submitted")
+        if outstanding >= SPECULATIVE_MAX_OUTSTANDING:
+            job["state"] = "skipped"
+        else:
+            _speculative_submitting += 1
+    if job["state"] == "skipped":
+        logger.info(f"Seçilmeyi bekleyen spekülatif üretim sınırına ulaşıldı, atlanıyor: {prompt[:50]}...")
+        return
+    try:
+        _submit_speculative_slot(job, key, prompt, aspect_ratio, derive, brand_input)
+    finally:
+        with _speculative_lock:
+            _speculative_submitting -= 1
+
+def _submit_speculative_slot(job, key, prompt, aspect_ratio, derive, brand_input):
+    """Üretim slotu alarak spekülatif üretimi Astria'ya gönderir ve kaydın durumunu günceller"""
+    try:
+        # Boşta kapasite yoksa spekülasyondan vazgeç; kullanıcıları bekletme
+        generation_scheduler.acquire("speculative", brand_input, timeout=5)
+    except SchedulerTimeout:
+        logger.info(f"Spekülatif üretim için kapasite yok, atlanıyor: {prompt[:50]}...")
+        with _speculative_lock:
+            job["state"] = "skipped"
+        return
+
+    prompt_id = None
+    try:
+        data, width, height = build_astria_prompt_data(prompt, aspect_ratio, derive)
+        with trace_span("astria.prompt.create", aspect_ratio=aspect_ratio, width=width, height=height, speculative=True) as span:
+            response = requests.post(
+                f"https://api.astria.ai/tunes/{ASTRIA_FLUX_MODEL_ID}/prompts",
+                headers={"Authorization": f"Bearer {os.getenv('ASTRIA_API_KEY')}"},
+                data=data,
+                timeout=30
+            )
+            mark_http_status(span, response.status_code)
+        if response.status_code in (200, 201):
+            prompt_id = response.json().get('id')
+    except Exception as e:
+        logger.warning(f"Spekülatif üretim başlatılamadı: {str(e)}")
+
+    # Slot yalnızca gönderim sırasında tutulur; seçilmeyi bekleyen işler
+    # SPECULATIVE_MAX_OUTSTANDING ile sınırlanır, diğer sınıfların payını işgal etmez
+    generation_scheduler.release()
+    if not prompt_id:
+        with _speculative_lock:
+            job["state"] = "failed"
+        return
+
+    with _speculative_lock:
+        cancelled = job["state"] == "cancelled"
+        job["prompt_id"] = prompt_id
+        if not cancelled:
+            job["state"] = "submitted"
+    if derive and not cancelled:
+        register_master_image(prompt, prompt_id)
+    logger.info(f"Spekülatif üretim başlatıldı: {prompt_id} ({aspect_ratio})")
+    if cancelled:
+        cancel_astria_prompt(prompt_id)
+
+def expire_speculative_jobs():
+    """Süresi dolan spekülatif kayıtları siler; seçilmemiş üretimleri Astria'da iptal eder"""
+    to_cancel = []
+    now = time.time()
+    with _speculative_lock:
+        for old_key, old_job in list(_speculative_jobs.items()):
+            if now - old_job["created_at"] > SPECULATIVE_TTL:
+                _speculative_jobs.pop(old_key)
+                _speculative_groups.pop(old_job["group_id"], None)
+                if old_job["state"] == "submitted":
+                    old_job["state"] = "cancelled"
+                    to_cancel.append(old_job["prompt_id"])
+    for prompt_id in to_cancel:
+        cancel_astria_prompt(prompt_id)
+    if to_cancel:
+        logger.info(f"Süresi dolan {len(to_cancel)} spekülatif üretim iptal edildi")
+
+def _sweep_speculative():
+    """Arka plan görevi: seçilmeyen spekülatif üretimleri süreleri dolunca iptal eder"""
+    while True:
+        time.sleep(min(60, SPECULATIVE_TTL))
+        try:
+            expire_speculative_jobs()
+        except Exception as e:
+            logger.warning(f"Spekülatif üretimler temizlenemedi: {str(e)}")
+
+if SPECULATIVE_GENERATION != "off":
+    threading.Thread(target=_sweep_speculative, name="speculative-sweeper", daemon=True).start()
+
+def start_speculative_generation(prompt_data, aspect_ratio, brand_input, derive):
+    """Önerilen promptlar için bütçe dahilinde arka planda üretim başlatır; grup ID'sini döndürür"""
+    group_id = uuid.uuid4().hex
+    keys = []
+    now = time.time()
+    with _speculative_lock:
+        for item in prompt_data[:SPECULATIVE_BUDGET]:
+            key = (_master_key(item["prompt"]), aspect_ratio)
+            if key in _speculative_jobs:
+                continue
+            _speculative_jobs[key] = {
+                "group_id": group_id,
+                "prompt": item["prompt"],
+                "derive": derive,
+                "state": "pending",
+                "prompt_id": None,
+                "created_at": now
+            }
+            keys.append(key)
+        _speculative_groups[group_id] = keys
+
+    for key in keys:
+        _speculative_executor.submit(contextvars.copy_context().run, _submit_speculative, key, brand_input)
+    logger.info(f"{len(keys)} önerilen prompt için spekülatif üretim kuyruğa alındı (grup: {group_id})")
+    return group_id
+
+def promote_speculative(prompt, aspect_ratio):
+    """
+    Kullanıcının seçtiği prompt için başlatılmış spekülatif üretimi sahiplenir ve prompt ID'sini döndürür.
+    Aynı gruptaki diğer üretimlerden SPECULATIVE_KEEP kadarı tutulur, kalanlar iptal edilir.
+    Seçilen üretim henüz gönderilmediyse beklenmez: iptal edilir ve None döner.
+    """
+    key = (_master_key(prompt), aspect_ratio)
+    to_cancel = []
+    with _speculative_lock:
+        job = _speculative_jobs.get(key)
+        if not job or time.time() - job["created_at"] > SPECULATIVE_TTL:
+            return None
+        promoted = job["state"] == "submitted"
+        if promoted:
+            job["state"] = "promoted"
+        elif job["state"] == "pending":
+            # Kuyrukta ya da gönderimde: kullanıcı kendi üretimini yapacak, bu iş gönderilince silinir
+            job["state"] = "cancelled"
+        siblings = [k for k in _speculative_groups.get(job["group_id"], []) if k != key]
+        kept = 0
+        for sibling_key in siblings:
+            sibling = _speculative_jobs.get(sibling_key)
+            if not sibling or sibling["state"] not in ("pending", "submitted"):
+                continue
+            if kept < SPECULATIVE_KEEP:
+                kept += 1
+                continue
+            if sibling["state"] == "submitted":
+                to_cancel.append(sibling["prompt_id"])
+            sibling["state"] = "cancelled"
+    for prompt_id in to_cancel:
+        _speculative_executor.submit(contextvars.copy_context().run, cancel_astria_prompt, prompt_id)
+    if not promoted:
+        logger.info(f"Seçilen spekülatif üretim hazır değil, yeni üretim yapılacak; iptal edilen: {len(to_cancel)}")
+        return None
+    logger.info(f"Spekülatif üretim seçildi: {job['prompt_id']}, iptal edilen: {len(to_cancel)}")
+    return job["prompt_id"]
+
+# Üretim geçmişi - tüm görsel ve video üretimleri SQLite'a yazılır, /history ile sayfalı olarak listelenir
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "generations.db")  # Boş bırakılırsa geçmiş kaydı kapalı
+HISTORY_PAGE_SIZE = 50  # Varsayılan sayfa boyutu
+HISTORY_MAX_PAGE_SIZE = 200  # Tek sayfada dönebilecek en fazla kayıt
+HISTORY_EXPORT_BATCH = 1000  # Dışa aktarımda veritabanından tek seferde okunan kayıt
+HISTORY_FILTERS = ("brand", "feature_type", "aspect_ratio", "status")
+HISTORY_COLUMNS = ("id", "feature_type", "job_id", "brand", "prompt", "aspect_ratio", "duration", "status", "result_urls", "created_at", "updated_at")
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    feature_type TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    brand TEXT,
+    prompt TEXT,
+    aspect_ratio TEXT,
+    duration TEXT,
+    status TEXT NOT NULL,
+    result_urls TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_generations_job ON generations (job_id, aspect_ratio, feature_type);
+CREATE INDEX IF NOT EXISTS idx_generations_created ON generations (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_generations_brand ON generations (brand, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_generations_feature_type ON generations (feature_type, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_generations_aspect_ratio ON generations (aspect_ratio, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_generations_status ON generations (status, created_at, id);
+"""
+
+_history_queue = queue.Queue(maxsize=10000)
+_history_local = threading.local()
+
+def _history_connection():
+    """Her iş parçacığı için ayrı bir okuma bağlantısı döndürür"""
+    connection = getattr(_history_local, "connection", None)
+    if connection is None:
+        connection = _history_local.connection = sqlite3.connect(HISTORY_DB_PATH, timeout=10)
+        connection.row_factory = sqlite3.Row
+    return connection
+
+def _write_history():
+    """Kuyruktaki kayıtları arka planda tek bir bağlantıyla toplu olarak yazar"""
+    connection = sqlite3.connect(HISTORY_DB_PATH, timeout=30)
+    while True:
+        statements = [_history_queue.get()]
+        while len(statements) < 500:
+            try:
+                statements.append(_history_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            with connection:
+                for sql, params in statements:
+                    connection.execute(sql, params)
+        except Exception as e:
+            logger.warning(f"Üretim geçmişi yazılamadı: {str(e)}")
+
+try:
+    if not HISTORY_DB_PATH:
+        raise ValueError("HISTORY_DB_PATH boş")
+    with sqlite3.connect(HISTORY_DB_PATH) as _connection:
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.executescript(HISTORY_SCHEMA)
+    threading.Thread(target=_write_history, name="history-writer", daemon=True).start()
+    HISTORY_AVAILABLE = True
+except Exception as e:
+    HISTORY_AVAILABLE = False
+    logger.warning(f"Üretim geçmişi veritabanı açılamadı: {str(e)}. Geçmiş kaydı devre dışı olacak.")
+
+def _enqueue_history(sql, params):
+    if not HISTORY_AVAILABLE:
+        return
+    try:
+        _history_queue.put_nowait((sql, params))
+    except queue.Full:
+        logger.warning("Üretim geçmişi kuyruğu dolu, kayıt atlandı")
+
+def record_generation(feature_type, job_id, status, brand=None, prompt=None, aspect_ratio=None, duration=None, result_urls=None):
+    """Yeni bir üretimi geçmişe ekler; aynı iş tekrar gelirse durumunu günceller"""
+    now = time.time()
+    _enqueue_history(
+        """INSERT INTO generations (feature_type, job_id, brand, prompt, aspect_ratio, duration, status, result_urls, created_at, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT (job_id, aspect_ratio, feature_type) DO UPDATE SET
+               status = excluded.status,
+               result_urls = COALESCE(excluded.result_urls, generations.result_urls),
+               updated_at = excluded.updated_at""",
+        (feature_type, str(job_id), brand, prompt, aspect_ratio, duration, status,
+         json.dumps(result_urls) if result_urls else None, now, now)
+    )
+
+def update_generation(feature_type, job_id, status, aspect_ratio=None, result_urls=None):
+    """Süren bir üretimin son durumunu geçmişe yazar; bitmiş kayıtlara dokunmaz.
+
+    Durum işin tüm kayıtlarına yazılır. aspect_ratio verilirse result_urls o orana
+    özgü (ör. ana görselden türetilmiş varyant) sayılır ve yalnızca o kayda yazılır.
+    """
+    now = time.time()
+    urls = json.dumps(result_urls) if result_urls else None
+    _enqueue_history(
+        """UPDATE generations SET status = ?, result_urls = COALESCE(?, result_urls), updated_at = ?
+           WHERE job_id = ? AND feature_type = ? AND status = 'processing'""",
+        (status, None if aspect_ratio else urls, now, str(job_id), feature_type)
+    )
+    if aspect_ratio and urls:
+        _enqueue_history(
+            """UPDATE generations SET result_urls = ?, updated_at = ?
+               WHERE job_id = ? AND feature_type = ? AND aspect_ratio = ?""",
+            (urls, now, str(job_id), feature_type, aspect_ratio)
+        )
+
+def _parse_history_time(value):
+    """Zaman filtresini Unix zamanı ya da ISO 8601 olarak okur"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+def encode_history_cursor(row):
+    return base64.urlsafe_b64encode(json.dumps([row["created_at"], row["id"]]).encode()).decode().rstrip("=")
+
+def decode_history_cursor(cursor):
+    created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    return float(created_at), int(row_id)
+
+def history_query(args):
+    """İstek parametrelerinden WHERE koşulunu ve parametrelerini oluşturur"""
+    conditions, params = [], []
+    for name in HISTORY_FILTERS:
+        if args.get(name):
+            conditions.append(f"{name} = ?")
+            params.append(args.get(name))
+    if args.get("since"):
+        conditions.append("created_at >= ?")
+        params.append(_parse_history_time(args.get("since")))
+    if args.get("until"):
+        conditions.append("created_at < ?")
+        params.append(_parse_history_time(args.get("until")))
+    return conditions, params
+
+def fetch_history_page(conditions, params, limit, after=None):
+    """Yeniden eskiye sıralı bir sayfayı (created_at, id) anahtarından sonrasını okuyarak döndürür"""
+    conditions = list(conditions)
+    params = list(params)
+    if after:
+        # Keyset sayfalama: OFFSET yerine son görülen kaydın anahtarından devam et
+        conditions.append("(created_at, id) < (?, ?)")
+        params.extend(after)
+    sql = f"SELECT {', '.join(HISTORY_COLUMNS)} FROM generations"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    return _history_connection().execute(sql, params + [limit]).fetchall()
+
+def history_item(row):
+    item = dict(row)
+    item["result_urls"] = json.loads(item["result_urls"]) if item["result_urls"] else []
+    return item
+
+# Tamamlanma süresi tahmini - istemcilere sonucun ne zaman hazır olacağına dair ETA ve Retry-After önerilir
+DEFAULT_COMPLETION_TIMES = {"astria": (30.0, 60.0), "veo2": (120.0, 240.0)}  # Veri yokken kullanılan (p50, p90) saniye
+COMPLETION_MIN_SAMPLES = 5  # Bir anahtarın tahmininin kullanılması için gereken en az ölçüm
+POLL_MIN_INTERVAL = 2  # Önerilecek en kısa yoklama aralığı (saniye)
+POLL_MAX_INTERVAL = 30  # Önerilecek en uzun yoklama aralığı (saniye)
+TRACKED_JOBS_LIMIT = 10000  # Başlangıç zamanı tutulan en fazla iş
+
+class StreamingQuantile:
+    """P² algoritmasıyla (Jain & Chlamtac) örnekleri saklamadan tek bir kantili tahmin eder"""
+
+    def __init__(self, p):
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        self.count += 1
+        q, n = self.heights, self.positions
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        # Örneğin düştüğü hücreyi bul, uç işaretçileri gerekirse genişlet
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Ara işaretçileri istenen konumlarına doğru parabolik (olmazsa doğrusal) olarak kaydır
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def value(self):
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            return self.heights[int(round(self.p * (len(self.heights) - 1)))]
+        return self.heights[2]
+
+class CompletionTimeModel:
+    """İşlem, boyut ve süreye göre tamamlanma sürelerinin p50/p90 tahminlerini çevrimiçi öğrenir"""
+
+    def __init__(self, quantiles=(0.5, 0.9)):
+        self.quantiles = quantiles
+        self._lock = threading.Lock()
+        self._estimators = {}  # anahtar -> [StreamingQuantile, ...]
+        self._jobs = collections.OrderedDict()  # iş ID'si -> (başlangıç zamanı, anahtar, ölçülebilir mi, son yoklama zamanı)
+
+    def start(self, job_id, key):
+        """Upstream'e gönderilen bir işin başlangıç zamanını kaydeder"""
+        with self._lock:
+            self._jobs[str(job_id)] = (time.time(), key, True, None)
+            while len(self._jobs) > TRACKED_JOBS_LIMIT:
+                self._jobs.popitem(last=False)
+
+    def observe(self, key, seconds):
+        """Tamamlanma süresini anahtar ve daha genel üst anahtarları için modele ekler"""
+        with self._lock:
+            for depth in range(1, len(key) + 1):
+                estimators = self._estimators.setdefault(key[:depth], [StreamingQuantile(p) for p in self.quantiles])
+                for estimator in estimators:
+                    estimator.add(seconds)
+
+    def finish(self, job_id, completed_at=None, started_at=None):
+        """Biten işin süresini modele ekler; başlangıcı bilinmeyen işler ölçülmez.
+
+        Upstream'in bildirdiği tamamlanma zamanı yoksa bitiş son "sürüyor" yoklamasına
+        alınır; hiç "sürüyor" görülmeden biten işler ölçülmez, yoksa süre yoklama
+        aralığına (o da bu tahmine) bağlanıp kendini besler.
+        """
+        with self._lock:
+            job = self._jobs.pop(str(job_id), None)
+        if not job:
+            return
+        started_at = started_at or (job[0] if job[2] else None)
+        completed_at = completed_at or job[3]
+        if started_at and completed_at and completed_at > started_at:
+            self.observe(job[1], completed_at - started_at)
+
+    def estimate(self, key):
+        """Yeterli ölçümü olan en özel anahtarın (p50, p90) tahminini döndürür"""
+        with self._lock:
+            for depth in range(len(key), 0, -1):
+                estimators = self._estimators.get(key[:depth])
+                if estimators and estimators[0].count >= COMPLETION_MIN_SAMPLES:
+                    return tuple(estimator.value() for estimator in estimators)
+        return DEFAULT_COMPLETION_TIMES.get(key[0], DEFAULT_COMPLETION_TIMES["astria"])
+
+    def hint(self, job_id, key):
+        """Süren iş için (kalan süre tahmini, önerilen yoklama aralığı) döndürür"""
+        with self._lock:
+            job = self._jobs.get(str(job_id))
+            if job is None:
+                # Başlangıcı bilinmiyor (ör. yeniden başlatma sonrası): ilk sorgudan itibaren say
+                job = (time.time(), key, False, None)
+            self._jobs[str(job_id)] = job[:3] + (time.time(),)
+        elapsed = time.time() - job[0]
+        p50, p90 = self.estimate(job[1])
+        if elapsed < p50:
+            eta = retry_after = p50 - elapsed
+        elif elapsed < p90:
+            eta = retry_after = p90 - elapsed
+        else:
+            # Tahmin aşıldı: geç kalan işler için geçen sürenin bir kısmı kadar bekle
+            eta, retry_after = 0.0, elapsed * 0.1
+        return round(eta, 1), int(min(max(retry_after, POLL_MIN_INTERVAL), POLL_MAX_INTERVAL))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "/".join(str(part) for part in key): {"count": estimators[0].count, **{f"p{int(e.p * 100)}": round(e.value(), 1) for e in estimators}}
+                for key, estimators in self._estimators.items()
+            }
+
+completion_model = CompletionTimeModel()
+
+def image_completion_key(data):
+    """Astria istek verisinden tamamlanma süresi anahtarını (işlem, boyut, adım sayısı) oluşturur"""
+    return ("astria", f"{data.get('prompt[w]')}x{data.get('prompt[h]')}", data.get('prompt[num_inference_steps]'))
+
+def astria_timestamps(result):
+    """Astria prompt yanıtındaki (created_at, updated_at) zamanlarını Unix zamanı olarak döndürür"""
+    timestamps = []
+    for field in ("created_at", "updated_at"):
+        try:
+            timestamps.append(_parse_history_time(str(result[field])))
+        except (KeyError, TypeError, ValueError):
+            timestamps.append(None)
+    return tuple(timestamps)
+
+# Durum sorgusu yapılandırması - biten işlerin durumu önbellekten, toplu sorgular sınırlı havuzla çözülür
+BULK_STATUS_MAX_IDS = int(os.getenv("BULK_STATUS_MAX_IDS", "500"))  # Tek toplu istekte sorgulanabilecek en fazla iş
+BULK_STATUS_CONCURRENCY = int(os.getenv("BULK_STATUS_CONCURRENCY", "16"))  # Aynı anda yapılacak upstream durum sorgusu
+STATUS_CACHE_TTL = int(os.getenv("STATUS_CACHE_TTL", "3600"))  # Biten işlerin durumunun önbellekte kalma süresi (saniye)
+STATUS_CACHE_SIZE = 10000  # Önbellekte tutulacak en fazla iş
+READY_IMAGE_STATUSES = ("completed", "success", "done")
+FAILED_IMAGE_STATUSES = ("failed", "error", "cancelled")
+
+_status_executor = concurrent.futures.ThreadPoolExecutor(max_workers=BULK_STATUS_CONCURRENCY, thread_name_prefix="status")
+_status_cache = collections.OrderedDict()  # ("image" | "video", iş ID'si) -> (zaman, upstream yanıtı)
+_status_cache_lock = threading.Lock()
+
+class StatusCheckError(Exception):
+    """Upstream durum sorgusu başarısız olduğunda döndürülecek mesaj ve HTTP kodunu taşır"""
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _cached_status(kind, job_id):
+    with _status_cache_lock:
+        cached = _status_cache.get((kind, job_id))
+        if cached and time.time() - cached[0] < STATUS_CACHE_TTL:
+            _status_cache.move_to_end((kind, job_id))
+            return cached[1]
+    return None
 
-# Log API key availability (not the actual keys)
-logger.info(f"OPENAI_API_KEY mevcut: {bool(OPENAI_API_KEY)}")
-logger.info(f"FAL_API_KEY mevcut: {bool(FAL_API_KEY)}")
-logger.info(f"ASTRIA_API_KEY mevcut: {bool(ASTRIA_API_KEY)}")
+def _cache_terminal_status(kind, job_id, result):
+    with _status_cache_lock:
+        _status_cache[(kind, job_id)] = (time.time(), result)
+        while len(_status_cache) > STATUS_CACHE_SIZE:
+            _status_cache.popitem(last=False)
 
-# Fal.ai API yapılandırması - FAL_KEY çevre değişkenini ayarla
-if FAL_API_KEY:
-    os.environ["FAL_KEY"] = FAL_API_KEY
-    logger.info(f"FAL_KEY çevre değişkeni ayarlandı: {FAL_API_KEY[:4]}..." if FAL_API_KEY else "FAL_KEY ayarlanamadı")
-else:
-    logger.warning("FAL_API_KEY bulunamadı, FAL_KEY çevre değişkeni ayarlanamadı.")
+def extract_image_urls(result):
+    """Astria prompt yanıtındaki görsel URL'lerini farklı formatlardan toplar"""
+    image_urls = []
+    if 'images' in result and isinstance(result['images'], list) and len(result['images']) > 0:
+        for image in result['images']:
+            if isinstance(image, dict) and 'url' in image:
+                image_urls.append(image.get('url'))
+            elif isinstance(image, str):
+                image_urls.append(image)
+    
+    # Diğer olası formatları kontrol et
+    if not image_urls and 'image_url' in result:
+        image_urls.append(result.get('image_url'))
+    if not image_urls and 'output' in result and isinstance(result['output'], dict) and 'image_url' in result['output']:
+        image_urls.append(result['output']['image_url'])
+    return image_urls
 
-# OpenAI istemcisini yapılandır
-client = None
-try:
-    if OPENAI_API_KEY:
-        # OpenAI API anahtarını doğrudan ayarla
-        openai.api_key = OPENAI_API_KEY
-        
-        # OpenAI istemcisini oluştur
-        client = OpenAI(
-            api_key=OPENAI_API_KEY,
+def fetch_image_status(prompt_id):
+    """Astria prompt durumunu döndürür; biten işler upstream'e gidilmeden önbellekten yanıtlanır"""
+    cached = _cached_status("image", prompt_id)
+    if cached is not None:
+        return cached
+    
+    api_key = os.getenv("ASTRIA_API_KEY")
+    if not api_key:
+        raise StatusCheckError("API yapılandırması eksik")
+    
+    api_url = f"https://api.astria.ai/tunes/{ASTRIA_FLUX_MODEL_ID}/prompts/{prompt_id}"
+    logger.info(f"Astria API durum kontrolü: {api_url}")
+    with trace_span("astria.prompt.status", prompt_id=prompt_id) as span:
+        response = requests.get(
+            api_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=upstream_timeout("astria.prompt.status")
         )
-        
-        # API bağlantısını test et
-        logger.info("OpenAI API bağlantısı test ediliyor...")
-        models = client.models.list()
-        logger.info(f"OpenAI API bağlantısı başarılı. Kullanılabilir model sayısı: {len(models.data)}")
+        mark_http_status(span, response.status_code)
+    
+    if response.status_code != 200:
+        logger.error(f"Astria API durum kontrolü hatası: {response.status_code} - {response.text}")
+        raise StatusCheckError(f"Durum kontrolü sırasında bir hata oluştu: {response.status_code}", response.status_code)
+    try:
+        result = response.json()
+    except json.JSONDecodeError:
+        logger.error(f"Astria API yanıtı JSON formatında değil: {response.text[:100]}...")
+        raise StatusCheckError("API yanıtı geçersiz format")
+    logger.info(f"Astria API durum yanıtı: {json.dumps(result)[:100]}...")
+    
+    if extract_image_urls(result) or str(result.get('status', '')).lower() in READY_IMAGE_STATUSES + FAILED_IMAGE_STATUSES:
+        _cache_terminal_status("image", prompt_id, result)
+    return result
+
+def image_status_payload(prompt_id, result, aspect_ratio):
+    """Astria yanıtını istemciye döndürülecek görsel durumuna çevirir"""
+    image_url = None
+    image_urls = extract_image_urls(result)
+    status = "processing"
+    is_ready = False
+    
+    # Neredeyse aynı görselleri işaretle veya gizle
+    duplicates, duplicates_pending = {}, False
+    if image_urls and PIL_AVAILABLE and DUPLICATE_MODE == "suppress":
+        image_urls, duplicates = filter_duplicates(image_urls)
+    elif image_urls and PIL_AVAILABLE and DUPLICATE_MODE == "flag":
+        duplicates, duplicates_pending = known_duplicates(image_urls)
+    
+    # Ana görselse, istenen oranın varyant adreslerini döndür
+    variant_aspect_ratio = None
+    if image_urls and aspect_ratio in ASPECT_RATIO_SIZES and complete_master_image(prompt_id, image_urls):
+        image_urls = [variant_url(u, aspect_ratio) for u in image_urls]
+        variant_aspect_ratio = aspect_ratio
+    
+    # İlk görsel URL'sini ana URL olarak ayarla (geriye dönük uyumluluk için)
+    if image_urls:
+        image_url = image_urls[0]
+    
+    # Durum bilgisini kontrol et
+    if 'status' in result:
+        status = result['status']
+        # Durum "completed" ise görsel hazır demektir
+        if status.lower() in READY_IMAGE_STATUSES:
+            is_ready = True
+    
+    # Görsel URL'si varsa hazır kabul et
+    if image_urls:
+        is_ready = True
+    
+    payload = {
+        "is_ready": is_ready,
+        "status": status,
+        "image_url": image_url,  # Geriye dönük uyumluluk için
+        "image_urls": image_urls,  # Tüm görsel URL'leri
+        "prompt_id": prompt_id,
+        "aspect_ratio": aspect_ratio,
+        "duplicates": duplicates  # Neredeyse aynı görseller (ana görsel URL'sine göre)
+    }
+    if duplicates_pending:
+        payload["duplicates_pending"] = True  # Hash'ler sürüyor; tekrar bilgisi sonraki yanıtta
+    
+    # İş bittiyse tuttuğu üretim slotunu bırak, bitmediyse ne zaman tekrar sorulacağını öner
+    if is_ready or str(status).lower() in FAILED_IMAGE_STATUSES:
+        generation_scheduler.complete(prompt_id)
+        if not is_ready:
+            unregister_master_image(prompt_id)
+        # Astria'nın bildirdiği bitiş zamanı (updated_at) yoklama gecikmesini ölçüme katmaz
+        started_at, completed_at = astria_timestamps(result)
+        completion_model.finish(prompt_id, completed_at, started_at)
+        update_generation("image", prompt_id, "completed" if is_ready else "failed", variant_aspect_ratio, image_urls)
     else:
-        logger.warning("OPENAI_API_KEY bulunamadı, OpenAI istemcisi oluşturulamadı.")
-except Exception as e:
-    logger.error(f"OpenAI API bağlantısı kurulamadı: {str(e)}")
-    logger.error(f"Hata izleme: {traceback.format_exc()}")
+        payload["eta_seconds"], payload["retry_after"] = completion_model.hint(prompt_id, ("astria",))
+    return payload
 
-# Ensure templates directory exists
-template_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
-if not os.path.exists(template_dir):
-    logger.warning(f"Templates directory not found at {template_dir}. Creating it.")
+def fetch_video_status(request_id):
+    """fal.ai istek durumunu döndürür; tamamlanan işler önbellekten yanıtlanır"""
+    cached = _cached_status("video", request_id)
+    if cached is not None:
+        return cached
+    if not FAL_CLIENT_AVAILABLE:
+        raise StatusCheckError("Durum kontrolü özelliği şu anda kullanılamıyor. Sunucu yapılandırması eksik.")
+    
+    check_deadline("fal.veo2.status")
+    logger.info(f"İstek durumu kontrol ediliyor (ID: {request_id})...")
+    status_start = time.perf_counter()
+    with trace_span("fal.veo2.status", request_id=request_id):
+        status = fal_client.status("fal-ai/veo2", request_id, with_logs=True)
+    capture_upstream("fal", "status", time.perf_counter() - status_start, body=fal_status_record(status))
+    
+    if type(status).__name__ == "Completed":
+        _cache_terminal_status("video", request_id, status)
+        completion_model.finish(request_id)
+        update_generation("video", request_id, "completed")
+    return status
+
+def video_status_payload(request_id, status):
+    """fal.ai durumunu, bitmemiş işler için ETA ve yoklama önerisiyle birlikte döndürür"""
+    payload = {"status": status, "request_id": request_id}
+    if type(status).__name__ in ("Queued", "InProgress"):
+        payload["eta_seconds"], payload["retry_after"] = completion_model.hint(request_id, ("veo2",))
+    return payload
+
+def _resolve_status(kind, job_id, aspect_ratio=None):
+    """Toplu sorgudaki tek bir işin durumunu çözer; hatayı sonuca yazar"""
     try:
-        os.makedirs(template_dir, exist_ok=True)
+        if kind == "image":
+            item = image_status_payload(job_id, fetch_image_status(job_id), aspect_ratio)
+        else:
+            item = video_status_payload(job_id, fetch_video_status(job_id))
+    except StatusCheckError as e:
+        item = {"error": str(e), "status_code": e.status_code}
+    except (DeadlineExceeded, requests.Timeout) as e:
+        item = {"error": str(e), "status_code": 504}
     except Exception as e:
-        logger.error(f"Failed to create templates directory: {str(e)}")
-
-# Create basic templates if they don't exist
-for template_name in ['welcome.html', 'index.html', 'image.html', 'video.html']:
-    template_path = os.path.join(template_dir, template_name)
-    if not os.path.exists(template_path):
-        logger.warning(f"Template {template_name} not found. Creating a basic version.")
-        try:
-            with open(template_path, 'w') as f:
-                f.write(f"<!DOCTYPE html><html><head><title>{template_name}</title></head><body><h1>{template_name}</h1><p>This is a placeholder template.</p></body></html>")
-        except Exception as e:
-            logger.error(f"Failed to create template {template_name}: {str(e)}")
+        logger.error(f"Toplu durum kontrolünde hata ({kind} {job_id}): {str(e)}")
+        item = {"error": str(e), "status_code": 500}
+    item["kind"] = kind
+    item["id"] = job_id
+    return item
 
-def detect_style(text: str, feature_type: str) -> str:
+def detect_style(text: str, feature_type: str, latency_slo: float = PROMPT_LATENCY_SLO) -> str:
     """
     OpenAI'ye ayrı bir istek atarak, girilen metne ve feature_type değerine göre promptun kendi stiline uygun bir stil belirler.
     """
@@ -149,23 +2129,25 @@ def detect_style(text: str, feature_type: str) -> str:
     logger.info(f"Stil belirleme isteği gönderiliyor. Metin: {text[:50]}... Özellik tipi: {feature_type}")
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
+        response, model = model_router.complete(
+            [
                 {"role": "system", "content": instructions},
                 {"role": "user", "content": f"Text: {text}\nFeature Type: {feature_type}\nDetermine the best style:"}
-            ]
+            ],
+            slo=latency_slo,
+            operation="detect_style",
+            max_tokens=100  # Tek bir stil tanımı için yeterli
         )
         
         style = response.choices[0].message.content.strip()
-        logger.info(f"Belirlenen stil: {style}")
+        logger.info(f"Belirlenen stil: {style} (model: {model})")
         return style
     except Exception as e:
         logger.error(f"Stil belirlenirken hata: {str(e)}")
         logger.error(f"Hata izleme: {traceback.format_exc()}")
         raise ValueError(f"Stil belirlenirken hata: {str(e)}")
 
-def generate_prompt(text: str, feature_type: str, aspect_ratio: str = "1:1") -> dict:
+def generate_prompt(text: str, feature_type: str, aspect_ratio: str = "1:1", latency_slo: float = PROMPT_LATENCY_SLO) -> dict:
     """
     OpenAI chat completion API kullanarak doğrudan prompt oluşturur.
     Her bir prompt için ayrı stil belirler.
@@ -223,14 +2205,14 @@ def generate_prompt(text: str, feature_type: str, aspect_ratio: str = "1:1") ->
         
         # Chat completion isteği gönder
         logger.info("Chat completion isteği gönderiliyor...")
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
+        response, model = model_router.complete(
+            [
                 {"role": "system", "content": system_instruction},
                 {"role": "user", "content": f"Metin: {text}\nTür: {feature_type}\nAspect Ratio: {aspect_ratio}"}
             ],
-            temperature=0.5,
-            max_tokens=1000
+            slo=latency_slo,
+            operation="generate_prompt",
+            temperature=0.5
         )
         
         # Yanıtı işle
@@ -277,7 +2259,8 @@ def generate_prompt(text: str, feature_type: str, aspect_ratio: str = "1:1") ->
             "input_text": text,
             "feature_type": feature_type,
             "aspect_ratio": aspect_ratio,
-            "prompt_data": prompt_data
+            "prompt_data": prompt_data,
+            "model": model  # İsteği karşılayan model
         }
         
     except Exception as e:
@@ -305,56 +2288,20 @@ def image():
     brand = request.args.get('brand')
     prompt_id = request.args.get('prompt_id')
     
-    # Eğer prompt_id varsa ve görsel URL'leri yoksa, check_image_status fonksiyonunu çağır
+    # Eğer prompt_id varsa ve görsel URL'leri yoksa, durumu Astria'dan sorgula
     if prompt_id and not image_urls:
         try:
-            # API bilgilerini al
-            api_key = os.getenv("ASTRIA_API_KEY")
-            
-            if not api_key:
-                logger.error("API yapılandırması eksik")
-                return render_template('image.html')
-            
-            # Flux model ID - Astria'nın genel Flux modelini kullanıyoruz
-            flux_model_id = "1504944"  # Flux1.dev from the gallery
-            
-            # API URL'sini oluştur - prompt_id ile durumu kontrol et
-            api_url = f"https://api.astria.ai/tunes/{flux_model_id}/prompts/{prompt_id}"
+            result = fetch_image_status(prompt_id)
+            image_urls = extract_image_urls(result)
             
-            headers = {
-                "Authorization": f"Bearer {api_key}"
-            }
-            
-            # API'ye istek gönder
-            logger.info(f"Astria API durum kontrolü: {api_url}")
-            response = requests.get(
-                api_url,
-                headers=headers
-            )
-            
-            # Yanıtı kontrol et
-            if response.status_code == 200:
-                # Yanıtı JSON olarak parse et
-                result = response.json()
-                
-                # Görsel URL'lerini farklı formatlarda kontrol et
-                if 'images' in result and isinstance(result['images'], list) and len(result['images']) > 0:
-                    for image in result['images']:
-                        if isinstance(image, dict) and 'url' in image:
-                            image_urls.append(image.get('url'))
-                        elif isinstance(image, str):
-                            image_urls.append(image)
-                
-                # Diğer olası formatları kontrol et
-                if not image_urls and 'image_url' in result:
-                    image_urls.append(result.get('image_url'))
-                if not image_urls and 'output' in result and isinstance(result['output'], dict) and 'image_url' in result['output']:
-                    image_urls.append(result['output']['image_url'])
-                
-                # Görsel URL'lerini loglama
-                if image_urls:
-                    logger.info(f"Toplam {len(image_urls)} görsel URL bulundu")
-                    logger.info(f"İlk görsel URL: {image_urls[0]}")
+            # Görsel URL'lerini loglama
+            if image_urls:
+                logger.info(f"Toplam {len(image_urls)} görsel URL bulundu")
+                logger.info(f"İlk görsel URL: {image_urls[0]}")
+                generation_scheduler.complete(prompt_id)
+                started_at, completed_at = astria_timestamps(result)
+                completion_model.finish(prompt_id, completed_at, started_at)
+                update_generation("image", prompt_id, "completed", result_urls=image_urls)
         except Exception as e:
             logger.error(f"Görsel durumu kontrol edilirken hata oluştu: {str(e)}")
     
@@ -381,12 +2328,20 @@ def generate_prompt_api():
         return jsonify({"error": "Missing required parameters: 'text' and 'feature_type'"}), 400
     
     try:
-        result = generate_prompt(text, feature_type, aspect_ratio)
+        result = generate_prompt(text, feature_type, aspect_ratio, request_latency_slo(data))
+        
+        # Kullanıcı promptları okurken önerilen promptların görsellerini arka planda üretmeye başla
+        if feature_type == "image" and os.getenv("ASTRIA_API_KEY") and speculation_requested(data):
+            result["speculation_id"] = start_speculative_generation(
+                result["prompt_data"], aspect_ratio, data.get("brand_input") or text,
+                derive_variants_requested(data, aspect_ratio)
+            )
         return jsonify(result)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
 
 @app.route('/generate_video', methods=['POST'])
+@idempotent
 def generate_video():
     prompt = request.form.get('prompt')
     brand_input = request.form.get('brand_input')
@@ -401,6 +2356,15 @@ def generate_video():
         logger.error("fal_client kütüphanesi yüklü değil. Video oluşturulamıyor.")
         return jsonify({"error": "Video oluşturma özelliği şu anda kullanılamıyor. Sunucu yapılandırması eksik."}), 500
     
+    # Upstream slotu al - toplu işler etkileşimli kullanıcıları bekletmesin
+    priority = request_priority()
+    try:
+        with trace_span("scheduler.wait", priority=priority, brand=brand_input):
+            generation_scheduler.acquire(priority, brand_input, timeout=min(GENERATION_QUEUE_TIMEOUT, max(remaining_time(), 0)))
+    except SchedulerTimeout as e:
+        logger.warning(f"Video üretim kuyruğu dolu: {str(e)}")
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+    
     try:
         logger.info(f"Fal.ai API'sine video oluşturma isteği gönderiliyor")
         logger.info(f"Kullanılan prompt: {prompt[:50]}...")
@@ -410,6 +2374,7 @@ def generate_video():
         # Fal.ai Veo2 API'si ile video oluştur
         try:
             logger.info("Fal.ai istemcisi ile video oluşturuluyor...")
+            handle = None
             
             # Benzersiz bir istek ID'si oluştur (sadece loglama için)
             request_id = str(uuid.uuid4())
@@ -438,13 +2403,29 @@ def generate_video():
             request_start_time = time.time()
             logger.info("Fal.ai isteği başlıyor...")
             
-            # Fal.ai Veo2 modelini çağır
-            result = fal_client.subscribe(
-                "fal-ai/veo2",
-                arguments=arguments,
-                with_logs=True,
-                on_queue_update=on_queue_update
-            )
+            # Fal.ai Veo2 kuyruğuna gönder ve süre bütçesi içinde sonucu bekle
+            with trace_span("fal.veo2.subscribe", aspect_ratio=aspect_ratio, duration=duration):
+                check_deadline("fal.veo2.submit")
+                handle = fal_client.submit("fal-ai/veo2", arguments=arguments)
+                logger.info(f"Fal.ai istek ID: {handle.request_id}")
+                completion_model.start(handle.request_id, ("veo2", aspect_ratio, duration))
+                record_generation("video", handle.request_id, "processing", brand_input, prompt, aspect_ratio, duration)
+                while True:
+                    status = handle.status(with_logs=True)
+                    on_queue_update(status)
+                    if type(status).__name__ == "Completed":
+                        completion_model.finish(handle.request_id, time.time())
+                        break
+                    try:
+                        check_deadline("fal.veo2.subscribe")
+                    except DeadlineExceeded:
+                        # Render'ı upstream'de de durdur ki slot boşa meşgul kalmasın
+                        cancel_fal_request(handle)
+                        update_generation("video", handle.request_id, "cancelled")
+                        raise
+                    time.sleep(FAL_POLL_INTERVAL)
+                result = handle.get()
+            capture_upstream("fal", "subscribe", time.time() - request_start_time, body=result)
             
             request_duration = time.time() - request_start_time
             logger.info(f"Fal.ai isteği tamamlandı. Süre: {request_duration:.2f} saniye")
@@ -458,14 +2439,18 @@ def generate_video():
             
             if not video_url:
                 logger.error(f"Video URL'si bulunamadı. Sonuç: {result}")
+                update_generation("video", handle.request_id, "failed")
                 return jsonify({"error": "Video URL'si alınamadı"}), 500
             
             logger.info(f"Video başarıyla oluşturuldu. URL: {video_url}")
+            update_generation("video", handle.request_id, "completed", result_urls=[video_url])
             
             # Video URL'sini test et
             logger.info("Video URL'si test ediliyor...")
             try:
-                video_test = requests.head(video_url, timeout=10)
+                with trace_span("fal.video.head") as span:
+                    video_test = requests.head(video_url, timeout=upstream_timeout("fal.video.head", share=0.5, cap=10))
+                    mark_http_status(span, video_test.status_code)
                 logger.info(f"Video URL'si test sonucu: {video_test.status_code}")
                 if video_test.status_code != 200:
                     logger.warning(f"Video URL'si erişilebilir değil: {video_test.status_code}")
@@ -480,8 +2465,12 @@ def generate_video():
                 "brand_input": brand_input
             })
             
+        except DeadlineExceeded:
+            raise
         except Exception as fal_error:
             logger.error(f"Fal.ai istemcisi hatası: {str(fal_error)}")
+            if handle:
+                update_generation("video", handle.request_id, "failed")
             logger.error(f"Hata türü: {type(fal_error).__name__}")
             logger.error(f"Hata detayları: {str(fal_error)}")
             logger.error(f"Hata izleme: {traceback.format_exc()}")
@@ -506,12 +2495,14 @@ def generate_video():
                 
                 # API isteği gönder
                 logger.info("REST API isteği gönderiliyor...")
-                response = requests.post(
-                    "https://api.fal.ai/v1/video/veo2",
-                    headers=headers,
-                    json=payload,
-                    timeout=120
-                )
+                with trace_span("fal.veo2.rest", aspect_ratio=aspect_ratio, duration=duration) as span:
+                    response = requests.post(
+                        "https://api.fal.ai/v1/video/veo2",
+                        headers=headers,
+                        json=payload,
+                        timeout=upstream_timeout("fal.veo2.rest", cap=120)
+                    )
+                    mark_http_status(span, response.status_code)
                 
                 # Yanıtı kontrol et
                 if response.status_code != 200:
@@ -529,6 +2520,7 @@ def generate_video():
                     return jsonify({"error": "Video URL'si alınamadı"}), 500
                 
                 logger.info(f"REST API ile video başarıyla oluşturuldu. URL: {video_url}")
+                record_generation("video", request_id, "completed", brand_input, prompt, aspect_ratio, duration, [video_url])
                 
                 # Video sayfasına yönlendir
                 return jsonify({
@@ -537,6 +2529,8 @@ def generate_video():
                     "brand_input": brand_input
                 })
                 
+            except (DeadlineExceeded, requests.Timeout):
+                raise
             except Exception as rest_error:
                 logger.error(f"REST API hatası: {str(rest_error)}")
                 logger.error(f"Hata izleme: {traceback.format_exc()}")
@@ -544,12 +2538,16 @@ def generate_video():
             
             return jsonify({"error": f"Video oluşturma başarısız oldu: {str(fal_error)}"}), 500
     
+    except (DeadlineExceeded, requests.Timeout) as e:
+        return deadline_response(e)
     except Exception as e:
         error_msg = f"Hata: {str(e)}"
         logger.error(error_msg)
         logger.error(f"Hata izleme: {traceback.format_exc()}")
         
         return jsonify({"error": f"Bir hata oluştu: {str(e)}"}), 500
+    finally:
+        generation_scheduler.release()
 
 @app.route('/video')
 def video():
@@ -566,25 +2564,24 @@ def video():
 @app.route('/check_status/<request_id>')
 def check_status(request_id):
     """İstek durumunu kontrol etmek için API endpoint'i"""
-    # Fal.ai client'ın kullanılabilir olup olmadığını kontrol et
-    if not FAL_CLIENT_AVAILABLE:
-        logger.error("fal_client kütüphanesi yüklü değil. Durum kontrolü yapılamıyor.")
-        return jsonify({"error": "Durum kontrolü özelliği şu anda kullanılamıyor. Sunucu yapılandırması eksik."}), 500
-        
     try:
-        logger.info(f"İstek durumu kontrol ediliyor (ID: {request_id})...")
-        status = fal_client.status("fal-ai/veo2", request_id, with_logs=True)
+        payload = video_status_payload(request_id, fetch_video_status(request_id))
+        payload["timestamp"] = time.time()
         
-        # Durum bilgisini JSON olarak döndür
-        return jsonify({
-            "status": status,
-            "timestamp": time.time()
-        })
+        # Durum bilgisini JSON olarak döndür, iş sürüyorsa yoklama aralığını öner
+        headers = {"Retry-After": str(payload["retry_after"])} if "retry_after" in payload else {}
+        return jsonify(payload), 200, headers
+    except (DeadlineExceeded, requests.Timeout) as e:
+        return deadline_response(e)
+    except StatusCheckError as e:
+        logger.error("fal_client kütüphanesi yüklü değil. Durum kontrolü yapılamıyor.")
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
         logger.error(f"İstek durumu kontrol edilirken hata oluştu: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/generate_image', methods=['POST'])
+@idempotent
 def generate_image():
     prompt = request.form.get('prompt')
     brand_input = request.form.get('brand_input')
@@ -594,6 +2591,58 @@ def generate_image():
     if not prompt:
         return jsonify({"error": "Geçersiz prompt seçimi"}), 400
     
+    # Prompt için arka planda başlatılmış spekülatif üretim varsa onu kullan
+    speculative_prompt_id = promote_speculative(prompt, aspect_ratio)
+    if speculative_prompt_id:
+        logger.info(f"Spekülatif üretim kullanılıyor (prompt ID: {speculative_prompt_id}), yeni üretim yapılmıyor")
+        record_generation("image", speculative_prompt_id, "processing", brand_input, prompt, aspect_ratio)
+        return jsonify({
+            "success": True,
+            "prompt_id": speculative_prompt_id,
+            "prompt": prompt,
+            "aspect_ratio": aspect_ratio,
+            "speculative": True,
+            "message": "Görsel asenkron olarak oluşturuluyor. Lütfen birkaç dakika sonra tekrar kontrol edin."
+        })
+    
+    # Varyant modunda tüm oranlar tek bir ana görselden türetilir
+    derive_variants = derive_variants_requested(request.form, aspect_ratio)
+    if derive_variants:
+        master = lookup_master_image(prompt)
+        if master:
+            logger.info(f"Ana görsel önbellekte bulundu (prompt ID: {master['prompt_id']}), yeni üretim yapılmıyor")
+            if master["image_urls"]:
+                image_urls = [variant_url(u, aspect_ratio) for u in master["image_urls"]]
+                record_generation("image", master["prompt_id"], "completed", brand_input, prompt, aspect_ratio, result_urls=image_urls)
+                return jsonify({
+                    "success": True,
+                    "image_url": image_urls[0],
+                    "image_urls": image_urls,
+                    "prompt": prompt,
+                    "aspect_ratio": aspect_ratio,
+                    "prompt_id": master["prompt_id"],
+                    "derived": True
+                })
+            record_generation("image", master["prompt_id"], "processing", brand_input, prompt, aspect_ratio)
+            return jsonify({
+                "success": True,
+                "prompt_id": master["prompt_id"],
+                "prompt": prompt,
+                "aspect_ratio": aspect_ratio,
+                "derived": True,
+                "message": "Görsel asenkron olarak oluşturuluyor. Lütfen birkaç dakika sonra tekrar kontrol edin."
+            })
+    
+    # Upstream slotu al - toplu işler etkileşimli kullanıcıları bekletmesin
+    priority = request_priority()
+    try:
+        with trace_span("scheduler.wait", priority=priority, brand=brand_input):
+            generation_scheduler.acquire(priority, brand_input, timeout=min(GENERATION_QUEUE_TIMEOUT, max(remaining_time(), 0)))
+    except SchedulerTimeout as e:
+        logger.warning(f"Görsel üretim kuyruğu dolu: {str(e)}")
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+    slot_held = False  # Asenkron işlerde slot, görsel hazır olana kadar tutulur
+    
     try:
         logger.info(f"Astria AI API'sine görsel oluşturma isteği gönderiliyor")
         logger.info(f"Kullanılan prompt: {prompt[:50]}...")  # İlk 50 karakteri logla
@@ -602,11 +2651,8 @@ def generate_image():
         # API URL'sini kontrol et - Flux API'sini kullanacağız
         api_key = os.getenv("ASTRIA_API_KEY")
         
-        # Flux model ID - Astria'nın genel Flux modelini kullanıyoruz
-        flux_model_id = "1504944"  # Flux1.dev from the gallery
-        
-        # API URL'sini oluştur
-        api_url = f"https://api.astria.ai/tunes/{flux_model_id}/prompts"
+        # API URL'sini oluştur - Astria'nın genel Flux modelini kullanıyoruz
+        api_url = f"https://api.astria.ai/tunes/{ASTRIA_FLUX_MODEL_ID}/prompts"
         
         if not api_key:
             logger.error(f"Astria API bilgileri eksik. Key: {api_key[:5] if api_key else None}...")
@@ -618,50 +2664,10 @@ def generate_image():
         request_id = str(uuid.uuid4())
         logger.info(f"Oluşturulan istek ID: {request_id}")
         
-        # Astria AI dokümantasyonuna göre boyutları ayarla
-        # Boyutlar 8'in katları olmalıdır
-        if aspect_ratio == "1:1":
-            width, height = 1024, 1024  # Kare format
-        elif aspect_ratio == "4:5":
-            width, height = 1024, 1280  # Instagram post formatı
-        elif aspect_ratio == "16:9":
-            width, height = 1280, 720  # Yatay video/web formatı
-        elif aspect_ratio == "9:16":
-            width, height = 720, 1280  # Dikey story formatı
-        else:
-            # Varsayılan olarak 1:1 kullan
-            width, height = 1024, 1024
-            logger.warning(f"Bilinmeyen aspect ratio: {aspect_ratio}, varsayılan 1:1 kullanılıyor")
-        
+        # Astria AI isteği için form data hazırla
+        data, width, height = build_astria_prompt_data(prompt, aspect_ratio, derive_variants)
         logger.info(f"Kullanılan görsel boyutu: {width}x{height}")
         
-        # Prompt'a aspect ratio bilgisini ekle ve optimize et
-        # Astria AI dokümantasyonuna göre prompt'u düzenle
-        aspect_ratio_prompt = ""
-        if aspect_ratio == "1:1":
-            aspect_ratio_prompt = "square format, 1:1 aspect ratio"
-        elif aspect_ratio == "4:5":
-            aspect_ratio_prompt = "portrait format, 4:5 aspect ratio, vertical composition"
-        elif aspect_ratio == "16:9":
-            aspect_ratio_prompt = "landscape format, 16:9 aspect ratio, horizontal composition"
-        elif aspect_ratio == "9:16":
-            aspect_ratio_prompt = "vertical format, 9:16 aspect ratio, portrait composition"
-        
-        enhanced_prompt = f"{prompt}, {aspect_ratio_prompt}, high quality, detailed"
-        logger.info(f"Geliştirilmiş prompt: {enhanced_prompt[:100]}...")
-        
-        # Astria AI API isteği için form data hazırla
-        # Dokümantasyona göre parametreleri ayarla
-        data = {
-            'prompt[text]': enhanced_prompt,
-            'prompt[w]': str(width),
-            'prompt[h]': str(height),
-            'prompt[num_inference_steps]': "50",  # Daha yüksek kalite için 50 adım
-            'prompt[guidance_scale]': "7.5",      # Prompt'a uyum için 7.5 değeri
-            'prompt[seed]': "-1",                 # Rastgele seed
-            'prompt[lora_scale]': "0.8"           # LoRA ağırlığı
-        }
-        
         headers = {
             "Authorization": f"Bearer {api_key}"
         }
@@ -674,11 +2680,14 @@ def generate_image():
         logger.info("Astria AI isteği başlıyor...")
         
         # Astria AI API'sine istek gönder
-        response = requests.post(
-            api_url,
-            headers=headers,
-            data=data
-        )
+        with trace_span("astria.prompt.create", aspect_ratio=aspect_ratio, width=width, height=height) as span:
+            response = requests.post(
+                api_url,
+                headers=headers,
+                data=data,
+                timeout=upstream_timeout("astria.prompt.create")
+            )
+            mark_http_status(span, response.status_code)
         
         # İstek süresini hesapla
         request_duration = time.time() - request_start_time
@@ -722,6 +2731,12 @@ def generate_image():
                 if not image_urls and 'output' in result and isinstance(result['output'], dict) and 'image_url' in result['output']:
                     image_urls.append(result['output']['image_url'])
                 
+                # Varyant modunda ana görseli kaydet (süren üretimler iptal kontrolünden sonra)
+                # ve istenen oranın varyant adreslerini döndür
+                if derive_variants and prompt_id and image_urls:
+                    register_master_image(prompt, prompt_id, image_urls)
+                    image_urls = [variant_url(u, aspect_ratio) for u in image_urls]
+                
                 # İlk görsel URL'sini ana URL olarak ayarla (geriye dönük uyumluluk için)
                 if image_urls:
                     image_url = image_urls[0]
@@ -739,7 +2754,17 @@ def generate_image():
                     
                     # Prompt ID varsa, asenkron işleme için döndür
                     if prompt_id:
+                        # İstemci beklerken ayrıldıysa üretimi iptal et ve slotu tutma
+                        if client_disconnected():
+                            cancel_astria_prompt(prompt_id)
+                            raise DeadlineExceeded("İstemci bağlantıyı kapattı (astria.prompt.create)")
                         logger.info(f"Prompt ID bulundu: {prompt_id}. Görsel hazır olduğunda kontrol edilebilir.")
+                        if derive_variants:
+                            register_master_image(prompt, prompt_id)
+                        generation_scheduler.hold(prompt_id)
+                        completion_model.start(prompt_id, image_completion_key(data))
+                        record_generation("image", prompt_id, "processing", brand_input, prompt, aspect_ratio)
+                        slot_held = True
                         return jsonify({
                             "success": True,
                             "prompt_id": prompt_id,
@@ -751,6 +2776,8 @@ def generate_image():
                     
                     return jsonify({"error": "Görsel oluşturulamadı", "details": result}), 500
                 
+                record_generation("image", prompt_id or request_id, "completed", brand_input, prompt, aspect_ratio, result_urls=image_urls)
+                
                 # Eğer yönlendirme isteniyorsa, image.html sayfasına yönlendir
                 if redirect_to_page:
                     return redirect(url_for('image', image_url=image_urls, prompt=prompt, brand=brand_input))
@@ -775,10 +2802,64 @@ def generate_image():
                 "details": response.text
             }), response.status_code
             
+    except (DeadlineExceeded, requests.Timeout) as e:
+        return deadline_response(e)
     except Exception as e:
         logger.error(f"Görsel oluşturma hatası: {str(e)}")
         logger.error(traceback.format_exc())
         return jsonify({"error": f"Görsel oluşturulurken bir hata oluştu: {str(e)}"}), 500
+    finally:
+        if not slot_held:
+            generation_scheduler.release()
+
+@app.route('/image_variant', methods=['GET'])
+def image_variant():
+    """Ana görselden istenen en-boy oranında akıllı kırpılmış varyantı sunar"""
+    image_url = request.args.get('image_url')
+    aspect_ratio = request.args.get('aspect_ratio', '1:1')
+    fit = request.args.get('fit', 'crop')
+    
+    if not PIL_AVAILABLE:
+        return jsonify({"error": "Görsel varyantı özelliği şu anda kullanılamıyor. Pillow yüklü değil."}), 500
+    if aspect_ratio not in ASPECT_RATIO_SIZES or fit not in ("crop", "pad"):
+        return jsonify({"error": "Geçersiz aspect_ratio veya fit değeri"}), 400
+    # Yalnızca bu sunucunun ürettiği ana görseller işlenir
+    if not image_url or not is_master_image_url(image_url):
+        return jsonify({"error": "Ana görsel bulunamadı"}), 404
+    
+    cache_key = (image_url, aspect_ratio, fit)
+    with _master_lock:
+        content = _variant_cache.get(cache_key)
+        if content is not None:
+            _variant_cache.move_to_end(cache_key)
+    
+    if content is None:
+        try:
+            with trace_span("astria.image.download") as span:
+                response = requests.get(image_url, timeout=30)
+                mark_http_status(span, response.status_code)
+            if response.status_code != 200:
+                return jsonify({"error": f"Ana görsel indirilemedi: {response.status_code}"}), 502
+            
+            with trace_span("image.variant.render", aspect_ratio=aspect_ratio, fit=fit):
+                variant = render_variant(Image.open(io.BytesIO(response.content)), aspect_ratio, fit)
+                buffer = io.BytesIO()
+                variant.save(buffer, format="JPEG", quality=90, optimize=True)
+                content = buffer.getvalue()
+        except Exception as e:
+            logger.error(f"Görsel varyantı oluşturulurken hata: {str(e)}")
+            logger.error(traceback.format_exc())
+            return jsonify({"error": f"Görsel varyantı oluşturulamadı: {str(e)}"}), 500
+        
+        with _master_lock:
+            _variant_cache[cache_key] = content
+            while len(_variant_cache) > VARIANT_CACHE_SIZE:
+                _variant_cache.popitem(last=False)
+        logger.info(f"Görsel varyantı oluşturuldu: {aspect_ratio} ({fit}), {len(content)} bayt")
+    
+    response = app.response_class(content, mimetype="image/jpeg")
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
 
 @app.route('/test_astria_api', methods=['GET'])
 def test_astria_api():
@@ -818,11 +2899,14 @@ def test_astria_api():
         
         # API'ye istek gönder
         logger.info(f"Astria API test isteği gönderiliyor: {api_url}")
-        response = requests.post(
-            api_url,
-            headers=headers,
-            data=data
-        )
+        with trace_span("astria.prompt.create", test=True) as span:
+            response = requests.post(
+                api_url,
+                headers=headers,
+                data=data,
+                timeout=upstream_timeout("astria.prompt.create")
+            )
+            mark_http_status(span, response.status_code)
         
         # Yanıtı kontrol et
         if response.status_code == 200 or response.status_code == 201:
@@ -852,105 +2936,197 @@ def test_astria_api():
 def check_image_status(prompt_id):
     """Asenkron görsel oluşturma işleminin durumunu kontrol etmek için kullanılan endpoint"""
     try:
-        # Yönlendirme seçeneğini kontrol et
-        redirect_to_page = request.args.get('redirect', 'false').lower() == 'true'
         prompt = request.args.get('prompt', '')
         brand = request.args.get('brand', '')
         aspect_ratio = request.args.get('aspect_ratio', '1:1')  # Aspect ratio bilgisini al
         
-        # API bilgilerini al
-        api_key = os.getenv("ASTRIA_API_KEY")
-        
-        if not api_key:
-            return jsonify({"error": "API yapılandırması eksik"}), 500
-        
-        # Flux model ID - Astria'nın genel Flux modelini kullanıyoruz
-        flux_model_id = "1504944"  # Flux1.dev from the gallery
-        
-        # API URL'sini oluştur - prompt_id ile durumu kontrol et
-        api_url = f"https://api.astria.ai/tunes/{flux_model_id}/prompts/{prompt_id}"
-        
-        headers = {
-            "Authorization": f"Bearer {api_key}"
-        }
-        
-        # API'ye istek gönder
-        logger.info(f"Astria API durum kontrolü: {api_url}")
-        response = requests.get(
-            api_url,
-            headers=headers
-        )
+        result = image_status_payload(prompt_id, fetch_image_status(prompt_id), aspect_ratio)
         
-        # Yanıtı kontrol et
-        if response.status_code == 200:
-            # Yanıtı JSON olarak parse et
-            try:
-                result = response.json()
-                logger.info(f"Astria API durum yanıtı: {json.dumps(result)[:100]}...")
-                
-                # Görsel URL'sini al
-                image_url = None
-                image_urls = []
-                status = "processing"
-                is_ready = False
-                
-                # Görsel URL'lerini farklı formatlarda kontrol et
-                if 'images' in result and isinstance(result['images'], list) and len(result['images']) > 0:
-                    for image in result['images']:
-                        if isinstance(image, dict) and 'url' in image:
-                            image_urls.append(image.get('url'))
-                        elif isinstance(image, str):
-                            image_urls.append(image)
-                
-                # Diğer olası formatları kontrol et
-                if not image_urls and 'image_url' in result:
-                    image_urls.append(result.get('image_url'))
-                if not image_urls and 'output' in result and isinstance(result['output'], dict) and 'image_url' in result['output']:
-                    image_urls.append(result['output']['image_url'])
-                
-                # İlk görsel URL'sini ana URL olarak ayarla (geriye dönük uyumluluk için)
-                if image_urls:
-                    image_url = image_urls[0]
-                
-                # Durum bilgisini kontrol et
-                if 'status' in result:
-                    status = result['status']
-                    # Durum "completed" ise görsel hazır demektir
-                    if status.lower() in ["completed", "success", "done"]:
-                        is_ready = True
-                
-                # Görsel URL'si varsa hazır kabul et
-                if image_urls:
-                    is_ready = True
-                
-                # Görsel URL'lerini loglama
-                if image_urls:
-                    logger.info(f"Toplam {len(image_urls)} görsel URL bulundu")
-                    logger.info(f"İlk görsel URL: {image_urls[0]}")
-                else:
-                    logger.warning(f"Görsel URL bulunamadı. Yanıt: {json.dumps(result)[:200]}...")
-                
-                # Her durumda JSON yanıtı döndür
-                return jsonify({
-                    "is_ready": is_ready,
-                    "status": status,
-                    "image_url": image_url,  # Geriye dönük uyumluluk için
-                    "image_urls": image_urls,  # Tüm görsel URL'leri
-                    "prompt_id": prompt_id,
-                    "prompt": prompt,
-                    "brand": brand,
-                    "aspect_ratio": aspect_ratio  # Aspect ratio bilgisini ekle
-                })
-            except json.JSONDecodeError:
-                logger.error(f"Astria API yanıtı JSON formatında değil: {response.text[:100]}...")
-                return jsonify({"error": "API yanıtı geçersiz format"}), 500
+        # Görsel URL'lerini loglama
+        if result["image_urls"]:
+            logger.info(f"Toplam {len(result['image_urls'])} görsel URL bulundu")
+            logger.info(f"İlk görsel URL: {result['image_urls'][0]}")
         else:
-            logger.error(f"Astria API durum kontrolü hatası: {response.status_code} - {response.text}")
-            return jsonify({"error": f"Durum kontrolü sırasında bir hata oluştu: {response.status_code}"}), response.status_code
+            logger.warning(f"Görsel URL bulunamadı. Durum: {result['status']}")
+        
+        # Her durumda JSON yanıtı döndür, iş sürüyorsa yoklama aralığını öner
+        result["prompt"] = prompt
+        result["brand"] = brand
+        headers = {"Retry-After": str(result["retry_after"])} if "retry_after" in result else {}
+        return jsonify(result), 200, headers
+    except (DeadlineExceeded, requests.Timeout) as e:
+        return deadline_response(e)
+    except StatusCheckError as e:
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
         logger.error(f"Durum kontrolü hatası: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/bulk_status', methods=['POST'])
+def bulk_status():
+    """Birden fazla görsel ve video işinin durumunu tek istekte döndürür"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "İstek gövdesi bir JSON nesnesi olmalı"}), 400
+    for field in ("images", "videos"):
+        if data.get(field) is not None and not isinstance(data[field], list):
+            return jsonify({"error": f"'{field}' bir liste olmalı"}), 400
+    jobs = []
+    for item in data.get("images") or []:
+        # Görseller ID ya da {"prompt_id": ..., "aspect_ratio": ...} olarak gönderilebilir
+        if isinstance(item, dict):
+            jobs.append(("image", str(item.get("prompt_id", "")), item.get("aspect_ratio", "1:1")))
+        else:
+            jobs.append(("image", str(item), data.get("aspect_ratio", "1:1")))
+    for item in data.get("videos") or []:
+        jobs.append(("video", str(item), None))
+    jobs = [job for job in dict.fromkeys(jobs) if job[1]]
+    
+    if not jobs:
+        return jsonify({"error": "Missing required parameter: 'images' or 'videos'"}), 400
+    if len(jobs) > BULK_STATUS_MAX_IDS:
+        return jsonify({"error": f"En fazla {BULK_STATUS_MAX_IDS} iş sorgulanabilir"}), 400
+    
+    logger.info(f"Toplu durum kontrolü: {len(jobs)} iş")
+    futures = [_status_executor.submit(contextvars.copy_context().run, _resolve_status, *job) for job in jobs]
+    
+    # İstenirse sonuçlar çözüldükçe NDJSON olarak akıtılır
+    stream = str(data.get("stream", request.args.get("stream", "false"))).lower() == "true" \
+        or "application/x-ndjson" in request.headers.get("Accept", "")
+    if stream:
+        def generate():
+            for future in concurrent.futures.as_completed(futures):
+                yield app.json.dumps(future.result()) + "\n"
+        return app.response_class(generate(), mimetype="application/x-ndjson")
+    
+    results = {"images": {}, "videos": {}}
+    for future in futures:
+        item = future.result()
+        kind, job_id = item.pop("kind"), item.pop("id")
+        results["images" if kind == "image" else "videos"][job_id] = item
+    results["timestamp"] = time.time()
+    
+    # Süren işler varsa en erken hazır olacak işe göre yoklama aralığını öner
+    pending = [item["retry_after"] for group in ("images", "videos") for item in results[group].values() if "retry_after" in item]
+    if pending:
+        results["retry_after"] = min(pending)
+        return jsonify(results), 200, {"Retry-After": str(results["retry_after"])}
+    return jsonify(results)
+
+@app.route('/history', methods=['GET'])
+def history():
+    """Geçmiş üretimleri yeniden eskiye, cursor ile sayfalı olarak listeler"""
+    if not HISTORY_AVAILABLE:
+        return jsonify({"error": "Üretim geçmişi şu anda kullanılamıyor"}), 503
+    try:
+        conditions, params = history_query(request.args)
+        after = decode_history_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        limit = min(max(int(request.args.get("limit", HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Geçersiz parametre: {str(e)}"}), 400
+    
+    # Sonraki sayfa olup olmadığını anlamak için bir fazla kayıt oku
+    rows = fetch_history_page(conditions, params, limit + 1, after)
+    next_cursor = encode_history_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return jsonify({
+        "items": [history_item(row) for row in rows[:limit]],
+        "next_cursor": next_cursor
+    })
+
+@app.route('/history/export', methods=['GET'])
+def history_export():
+    """Filtrelere uyan tüm geçmişi NDJSON veya CSV olarak akış halinde dışa aktarır"""
+    if not HISTORY_AVAILABLE:
+        return jsonify({"error": "Üretim geçmişi şu anda kullanılamıyor"}), 503
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format 'ndjson' veya 'csv' olmalı"}), 400
+    try:
+        conditions, params = history_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Geçersiz parametre: {str(e)}"}), 400
+    
+    def generate():
+        # Tüm sonucu belleğe almadan keyset sayfaları halinde oku
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(HISTORY_COLUMNS)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        after = None
+        while True:
+            rows = fetch_history_page(conditions, params, HISTORY_EXPORT_BATCH, after)
+            if not rows:
+                break
+            if export_format == "csv":
+                for row in rows:
+                    writer.writerow([row[column] for column in HISTORY_COLUMNS])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                yield "".join(json.dumps(history_item(row), ensure_ascii=False) + "\n" for row in rows)
+            after = (rows[-1]["created_at"], rows[-1]["id"])
+    
+    mimetype = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return app.response_class(generate(), mimetype=mimetype,
+                              headers={"Content-Disposition": f"attachment; filename=generations.{export_format}"})
+
+@app.route('/extract-images', methods=['POST'])
+def extract_images():
+    """Bir veya birden fazla ürün sayfasından görsel URL'lerini çıkarır"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "İstek gövdesi bir JSON nesnesi olmalı"}), 400
+    if data.get("urls") is not None and not isinstance(data["urls"], list):
+        return jsonify({"error": "'urls' bir liste olmalı"}), 400
+    urls = data.get("urls") or ([data["url"]] if data.get("url") else [])
+    urls = [u.strip() for u in urls if isinstance(u, str) and u.strip()]
+    
+    if not urls:
+        return jsonify({"error": "Missing required parameter: 'url' or 'urls'"}), 400
+    if len(urls) > EXTRACT_MAX_URLS:
+        return jsonify({"error": f"En fazla {EXTRACT_MAX_URLS} sayfa gönderilebilir"}), 400
+    if any(urllib.parse.urlsplit(u).scheme not in ("http", "https") for u in urls):
+        return jsonify({"error": "Yalnızca http ve https adresleri desteklenir"}), 400
+    
+    logger.info(f"Görsel çıkarma isteği: {len(urls)} sayfa")
+    
+    # Sayfaları sınırlı eşzamanlılıkla indir
+    futures = {u: _extract_executor.submit(contextvars.copy_context().run, fetch_page_images, u) for u in dict.fromkeys(urls)}
+    results = []
+    product_images = []
+    seen = set()
+    rejected = False
+    for page_url, future in futures.items():
+        try:
+            images = future.result()
+            results.append({"url": page_url, "product_images": images})
+            for image_url in images:
+                if image_url not in seen:
+                    seen.add(image_url)
+                    product_images.append(image_url)
+        except UnsafeURLError as e:
+            logger.warning(f"Güvensiz sayfa adresi reddedildi ({page_url}): {str(e)}")
+            results.append({"url": page_url, "product_images": [], "error": str(e)})
+            rejected = True
+        except Exception as e:
+            logger.error(f"Sayfadan görsel çıkarılamadı ({page_url}): {str(e)}")
+            results.append({"url": page_url, "product_images": [], "error": str(e)})
+    
+    if len(results) == 1 and rejected:
+        return jsonify({"error": results[0]["error"]}), 400
+    if len(results) == 1 and "error" in results[0]:
+        return jsonify({"error": f"Görseller çıkarılamadı: {results[0]['error']}"}), 502
+    
+    logger.info(f"Toplam {len(product_images)} benzersiz görsel bulundu")
+    return jsonify({
+        "product_images": product_images,
+        "results": results
+    })
+
 @app.route('/debug')
 def debug():
     """Debug endpoint to check environment variables and configuration"""
@@ -961,6 +3137,10 @@ def debug():
         "fal_api_key_exists": bool(FAL_API_KEY),
         "astria_api_key_exists": bool(ASTRIA_API_KEY),
         "fal_client_available": FAL_CLIENT_AVAILABLE,
+        "generation_scheduler": generation_scheduler.snapshot(),
+        "image_hash_index_size": len(image_hash_index),
+        "prompt_models": model_router.snapshot(),
+        "completion_times": completion_model.snapshot(),
         "template_dir_exists": os.path.exists(template_dir),
         "templates": [f for f in os.listdir(template_dir) if os.path.isfile(os.path.join(template_dir, f))] if os.path.exists(template_dir) else []
     }
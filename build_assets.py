@@ -0,0 +1,125 @@
+"""
+Statik dosyalar için derleme adımı.
+
+static/ altındaki JS ve CSS dosyalarını küçültür, içerik hash'i ile parmak izi ekler
+(ör. js/main.3f2a9c1b.js), gzip ve brotli ile önceden sıkıştırır ve sonuçları
+static/dist/ altına yazar. Mantıksal yol -> hash'li yol eşlemesi
+static/dist/manifest.json dosyasına kaydedilir; app.py bu dosyayı okuyarak
+şablonlarda hash'li isimleri kullanır.
+
+Kullanım:
+    python build_assets.py
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# İsteğe bağlı küçültme ve sıkıştırma kütüphaneleri
+try:
+    import rjsmin
+    RJSMIN_AVAILABLE = True
+except ImportError:
+    RJSMIN_AVAILABLE = False
+    logger.warning("rjsmin yüklü değil, JS için basit küçültme kullanılacak.")
+
+try:
+    import rcssmin
+    RCSSMIN_AVAILABLE = True
+except ImportError:
+    RCSSMIN_AVAILABLE = False
+    logger.warning("rcssmin yüklü değil, CSS için basit küçültme kullanılacak.")
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    logger.warning("brotli yüklü değil, .br dosyaları oluşturulmayacak.")
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+ASSET_EXTENSIONS = ('.js', '.css')
+
+def minify_js(source: str) -> str:
+    """JS kaynağını küçültür; rjsmin yoksa yalnızca girinti, boş satır ve yorum satırlarını atar"""
+    if RJSMIN_AVAILABLE:
+        return rjsmin.jsmin(source)
+
+    lines = []
+    in_template = False
+    for line in source.splitlines():
+        if not in_template:
+            line = line.strip()
+            if not line or line.startswith('//'):
+                continue
+        lines.append(line)
+        # Template literal içindeki satırlara dokunma
+        if line.replace('\\`', '').count('`') % 2 == 1:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+def minify_css(source: str) -> str:
+    """CSS kaynağını küçültür; rcssmin yoksa yorumları ve gereksiz boşlukları atar"""
+    if RCSSMIN_AVAILABLE:
+        return rcssmin.cssmin(source)
+
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{}:;,>])\s*', r'\1', source)
+    return source.replace(';}', '}').strip() + '\n'
+
+def build_asset(rel_path: str) -> str:
+    """Tek bir dosyayı küçültür, hash'li isimle yazar ve sıkıştırılmış kopyalarını üretir"""
+    with open(os.path.join(STATIC_DIR, rel_path), encoding='utf-8') as f:
+        source = f.read()
+
+    content = (minify_js(source) if rel_path.endswith('.js') else minify_css(source)).encode('utf-8')
+    digest = hashlib.sha256(content).hexdigest()[:8]
+
+    base, ext = os.path.splitext(rel_path)
+    hashed_path = f"{base}.{digest}{ext}"
+    out_path = os.path.join(DIST_DIR, hashed_path)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    with open(out_path, 'wb') as f:
+        f.write(content)
+    with open(out_path + '.gz', 'wb') as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if BROTLI_AVAILABLE:
+        with open(out_path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+
+    logger.info(f"{rel_path} -> dist/{hashed_path} ({len(source.encode('utf-8'))} -> {len(content)} bayt)")
+    return hashed_path
+
+def build():
+    """static/ altındaki tüm JS ve CSS dosyalarını derler ve manifest'i yazar"""
+    if os.path.exists(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+    for root, dirs, files in os.walk(STATIC_DIR):
+        if os.path.abspath(root).startswith(DIST_DIR):
+            continue
+        for name in sorted(files):
+            if not name.endswith(ASSET_EXTENSIONS):
+                continue
+            rel_path = os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, '/')
+            manifest[rel_path] = build_asset(rel_path)
+
+    with open(os.path.join(DIST_DIR, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    logger.info(f"Manifest yazıldı: {len(manifest)} dosya")
+    return manifest
+
+if __name__ == '__main__':
+    build()
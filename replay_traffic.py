@@ -0,0 +1,240 @@
+"""
+Kaydedilmiş trafiği tekrar oynatarak performans regresyonu testi yapar.
+
+TRAFFIC_CAPTURE_FILE ile kaydedilen JSONL dosyasındaki gelen istekler, orijinal
+zamanlamalarıyla (veya --speed ile hızlandırılıp yavaşlatılarak) uygulamaya tekrar
+gönderilir. OpenAI, Astria ve fal çağrılarına gerçek servisler yerine kayıttaki
+yanıtlar, kayıttaki gecikmelerle döndürülür. Sonunda her route için kayıttaki ve
+tekrar oynatmadaki gecikmeler karşılaştırılır.
+
+Kullanım:
+    python replay_traffic.py capture.jsonl [--speed 2.0] [--concurrency 32] [--output results.jsonl]
+"""
+import argparse
+import collections
+import concurrent.futures
+import contextvars
+import dataclasses
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import types
+import urllib.parse
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("replay_traffic")
+
+# Tekrar oynatılan gelen isteğin kayıttaki ID'si; uygulama iş parçacıklarına context ile taşınır
+_replay_request_id = contextvars.ContextVar("replay_request_id", default=None)
+
+class RecordedUpstreams:
+    """Kayıttaki upstream yanıtlarını, kaydı tetikleyen gelen isteğe ve çağrı anahtarına göre sırayla dağıtır"""
+
+    def __init__(self, records, speed):
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._queues = collections.defaultdict(collections.deque)
+        self.misses = collections.Counter()
+        for record in records:
+            self._queues[(record.get("req"),) + self.key_for(record)].append(record)
+
+    @staticmethod
+    def key_for(record):
+        if record["svc"] == "http":
+            parsed = urllib.parse.urlsplit(record.get("url", ""))
+            return ("http", record.get("method", "GET").upper(), f"{parsed.scheme}://{parsed.netloc}{parsed.path}")
+        return (record["svc"], record["op"])
+
+    def take(self, key):
+        """Anahtar için sıradaki kaydı döndürür ve kayıttaki süre kadar bekler"""
+        with self._lock:
+            # Önce bu isteğin kendi yanıtları, sonra isteğe bağlı olmayanlar; istek dışı
+            # (arka plan) çağrılarında en eski kayıt hangi isteğe aitse oradan alınır
+            record = None
+            for owner in (_replay_request_id.get(), None):
+                queue = self._queues.get((owner,) + key)
+                if queue:
+                    record = queue.popleft()
+                    break
+            if record is None and _replay_request_id.get() is None:
+                queues = [q for k, q in self._queues.items() if k[1:] == key and q]
+                if queues:
+                    record = min(queues, key=lambda q: q[0]["ts"]).popleft()
+        if record is None:
+            self.misses[key] += 1
+            raise RuntimeError(f"Kayıtta yanıt yok: {key}")
+        time.sleep(record["dur"] / self.speed)
+        return record
+
+def install_stubs(app_module, upstreams):
+    """Uygulamanın upstream istemcilerini kayıttan yanıt veren sahteleriyle değiştirir"""
+    import requests
+
+    def replay_request(self, method, url, *args, **kwargs):
+        parsed = urllib.parse.urlsplit(url)
+        record = upstreams.take(("http", method.upper(), f"{parsed.scheme}://{parsed.netloc}{parsed.path}"))
+        if record.get("error"):
+            raise requests.ConnectionError(record["error"])
+        response = requests.Response()
+        response.status_code = record["status"]
+        response.url = url
+        body = record.get("body") or {}
+        if "json" in body:
+            response._content = json.dumps(body["json"]).encode("utf-8")
+            response.headers["Content-Type"] = "application/json"
+        else:
+            response._content = b"\0" * body.get("length", 0)
+            response.headers["Content-Type"] = body.get("content_type", "application/octet-stream")
+        if body.get("location"):
+            response.headers["Location"] = body["location"]
+        # Gövde zaten bellekte; iter_content() ve close() akış okuyor gibi çalışsın
+        response._content_consumed = True
+        response.raw = io.BytesIO(response._content)
+        return response
+
+    requests.Session.request = replay_request
+
+    def create(**kwargs):
+        record = upstreams.take(("openai", kwargs["model"]))
+        if record.get("error"):
+            raise RuntimeError(record["error"])
+        message = types.SimpleNamespace(content=record["body"]["content"])
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+    replay_client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+    replay_client.with_options = lambda **options: replay_client
+    app_module.client = replay_client
+
+    status_types = {}
+
+    def rebuild_status(record):
+        """Kayıttaki {type, fields} biçimini fal durum nesnesine (aynı sınıf adıyla) geri çevirir"""
+        if not isinstance(record, dict) or "type" not in record:
+            return record
+        fields = record.get("fields") or {}
+        name = record["type"]
+        if name not in status_types:
+            status_types[name] = dataclasses.make_dataclass(name, list(fields))
+        return status_types[name](**fields)
+
+    @dataclasses.dataclass
+    class Completed:
+        logs: list = None
+
+    class ReplayHandle:
+        """Kuyruk isteği hemen tamamlanmış sayılır; sonuç kayıttaki gecikmeyle döner"""
+        request_id = "replay"
+
+        def status(self, with_logs=False):
+            return Completed()
+
+        def get(self):
+            return upstreams.take(("fal", "subscribe")).get("body")
+
+    def submit(application, arguments=None, **kwargs):
+        return ReplayHandle()
+
+    def status(application, request_id, **kwargs):
+        return rebuild_status(upstreams.take(("fal", "status")).get("body"))
+
+    app_module.fal_client = types.SimpleNamespace(submit=submit, status=status)
+    app_module.FAL_CLIENT_AVAILABLE = True
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def replay(path, speed, concurrency, output):
+    incoming, upstream = [], []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                (incoming if record["t"] == "in" else upstream).append(record)
+    incoming.sort(key=lambda r: r["ts"])
+    if not incoming:
+        logger.error("Kayıtta gelen istek bulunamadı")
+        return 1
+    logger.info(f"{len(incoming)} gelen istek, {len(upstream)} upstream yanıtı yüklendi (hız: {speed}x)")
+
+    # Uygulamayı gerçek servislere bağlanmadan yükle
+    for name in ("OPENAI_API_KEY", "TRAFFIC_CAPTURE_FILE", "TRACE_COLLECTOR_URL"):
+        os.environ.pop(name, None)
+    os.environ.setdefault("ASTRIA_API_KEY", "replay")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as app_module
+    logging.getLogger(app_module.__name__).setLevel(logging.WARNING)
+
+    upstreams = RecordedUpstreams(upstream, speed)
+    install_stubs(app_module, upstreams)
+    test_client = app_module.app.test_client()
+
+    def send(record):
+        _replay_request_id.set(record["id"])
+        delay = (record["ts"] - incoming[0]["ts"]) / speed - (time.perf_counter() - started)
+        if delay > 0:
+            time.sleep(delay)
+        kwargs = {"headers": record.get("headers", {}), "query_string": record.get("query", "")}
+        if "form" in record:
+            kwargs["data"] = record["form"]
+        elif "json" in record:
+            kwargs["json"] = record["json"]
+        start = time.perf_counter()
+        response = test_client.open(record["path"], method=record["method"], **kwargs)
+        response.get_data()
+        return {
+            "id": record["id"],
+            "method": record["method"],
+            "path": record["path"],
+            "recorded_status": record["status"],
+            "status": response.status_code,
+            "recorded_dur": record["dur"],
+            "dur": round(time.perf_counter() - start, 4)
+        }
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, incoming))
+    elapsed = time.perf_counter() - started
+
+    if output:
+        with open(output, "w") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+    # Route bazında özet
+    adapter = app_module.app.url_map.bind("")
+    by_route = collections.defaultdict(list)
+    for result in results:
+        try:
+            endpoint = adapter.match(result["path"], method=result["method"])[0]
+        except Exception:
+            endpoint = result["path"]
+        by_route[(result["method"], endpoint)].append(result)
+    print(f"\n{len(results)} istek {elapsed:.2f} saniyede tekrar oynatıldı\n")
+    print(f"{'route':<40}{'n':>6}{'kayıt p50':>12}{'replay p50':>12}{'kayıt p95':>12}{'replay p95':>12}{'durum farkı':>13}")
+    for (method, endpoint), items in sorted(by_route.items()):
+        recorded = [r["recorded_dur"] / speed for r in items]
+        replayed = [r["dur"] for r in items]
+        mismatches = sum(1 for r in items if r["status"] != r["recorded_status"])
+        print(f"{method + ' ' + endpoint:<40}{len(items):>6}"
+              f"{percentile(recorded, 0.5):>12.3f}{percentile(replayed, 0.5):>12.3f}"
+              f"{percentile(recorded, 0.95):>12.3f}{percentile(replayed, 0.95):>12.3f}{mismatches:>13}")
+    if upstreams.misses:
+        print(f"\nKayıtta karşılığı olmayan upstream çağrıları: {dict(upstreams.misses)}")
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Kaydedilmiş trafiği uygulamaya tekrar oynatır")
+    parser.add_argument("capture_file", help="TRAFFIC_CAPTURE_FILE ile kaydedilen JSONL dosyası")
+    parser.add_argument("--speed", type=float, default=1.0, help="Zaman ölçeği (2.0 = iki kat hızlı)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Aynı anda gönderilecek en fazla istek")
+    parser.add_argument("--output", help="İstek bazında sonuçların yazılacağı JSONL dosyası")
+    args = parser.parse_args()
+    sys.exit(replay(args.capture_file, args.speed, args.concurrency, args.output))
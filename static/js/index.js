@@ -0,0 +1,25 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Video boyutu seçimi için
+    const aspectRatioInputs = document.querySelectorAll('.aspect-ratio-input');
+    const aspectRatioOptions = document.querySelectorAll('.aspect-ratio-option');
+
+    // Sayfa yüklendiğinde varsayılan seçimi işaretle
+    updateSelectedAspectRatio();
+
+    // Her bir radio input için event listener ekle
+    aspectRatioInputs.forEach(input => {
+        input.addEventListener('change', updateSelectedAspectRatio);
+    });
+
+    // Seçilen aspect ratio'yu güncelle
+    function updateSelectedAspectRatio() {
+        aspectRatioOptions.forEach(option => {
+            const input = option.querySelector('input');
+            if (input.checked) {
+                option.classList.add('selected');
+            } else {
+                option.classList.remove('selected');
+            }
+        });
+    }
+});
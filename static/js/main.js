@@ -8,6 +8,7 @@ document.addEventListener('DOMContentLoaded', function() {
     
     let brandInput = '';
     let selectedPromptCard = null; // Seçilen prompt kartını takip etmek için değişken
+    let traceId = null; // Prompt ve video isteklerini tek bir trace altında toplamak için
     
     // Prompt kartını seçili olarak işaretleyen fonksiyon
     function selectPromptCard(card) {
@@ -41,7 +42,8 @@ document.addEventListener('DOMContentLoaded', function() {
         // Promptları oluşturma işlemi
         loadingPrompts.classList.remove('hidden');
         
-        // Yeni API endpoint'ine istek at
+        // Yeni API endpoint'ine istek at - her yeni prompt üretimi yeni bir trace başlatır
+        traceId = null;
         fetch('/generate-prompt', {
             method: 'POST',
             headers: {
@@ -53,6 +55,7 @@ document.addEventListener('DOMContentLoaded', function() {
             })
         })
         .then(response => {
+            traceId = response.headers.get('X-Trace-Id') || traceId;
             if (!response.ok) {
                 throw new Error(`HTTP error! Status: ${response.status}`);
             }
@@ -353,6 +356,7 @@ document.addEventListener('DOMContentLoaded', function() {
         // Video oluşturma isteği gönder
         fetch('/generate_video', {
             method: 'POST',
+            headers: traceId ? { 'X-Trace-Id': traceId } : {},
             body: formData
         })
         .then(response => response.json())
@@ -0,0 +1,140 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const video = document.getElementById('generatedVideo');
+    const videoLoading = document.getElementById('videoLoading');
+    const videoError = document.getElementById('videoError');
+    const downloadBtn = document.getElementById('downloadBtn');
+    const usedPrompt = document.getElementById('usedPrompt');
+    const regenerateForm = document.getElementById('regenerateForm');
+    const regenerateBtn = document.getElementById('regenerateBtn');
+    const regenerateError = document.getElementById('regenerateError');
+    const editedPrompt = document.getElementById('editedPrompt');
+
+    // Video boyutu seçimi için
+    const aspectRatioInputs = document.querySelectorAll('.aspect-ratio-input');
+    const aspectRatioOptions = document.querySelectorAll('.aspect-ratio-option');
+
+    // Sayfa yüklendiğinde varsayılan seçimi işaretle
+    updateSelectedAspectRatio();
+
+    // Her bir radio input için event listener ekle
+    aspectRatioInputs.forEach(input => {
+        input.addEventListener('change', updateSelectedAspectRatio);
+    });
+
+    // Seçilen aspect ratio'yu güncelle
+    function updateSelectedAspectRatio() {
+        aspectRatioOptions.forEach(option => {
+            const input = option.querySelector('input');
+            if (input.checked) {
+                option.classList.add('selected');
+            } else {
+                option.classList.remove('selected');
+            }
+        });
+    }
+
+    // Video yüklendiğinde
+    video.addEventListener('loadeddata', function() {
+        videoLoading.classList.add('hidden');
+        video.classList.remove('hidden');
+    });
+
+    // Video yüklenme hatası
+    video.addEventListener('error', function() {
+        videoLoading.classList.add('hidden');
+        videoError.classList.remove('hidden');
+        console.error('Video yüklenirken bir hata oluştu');
+    });
+
+    // 10 saniye sonra hala yüklenmemişse hata göster
+    setTimeout(function() {
+        if (video.readyState === 0) {
+            videoLoading.classList.add('hidden');
+            videoError.classList.remove('hidden');
+            console.error('Video yükleme zaman aşımı');
+        }
+    }, 10000);
+
+    // Yeniden video oluşturma formu gönderildiğinde
+    regenerateForm.addEventListener('submit', function(e) {
+        e.preventDefault();
+
+        // Form verilerini al
+        const prompt = document.getElementById('promptInput').value.trim();
+        const aspectRatio = document.querySelector('input[name="aspect_ratio"]:checked').value;
+        const duration = document.getElementById('videoDuration').value;
+        const brand = document.body.dataset.brand;
+
+        if (!prompt) {
+            alert("Lütfen geçerli bir prompt girin.");
+            return;
+        }
+
+        // Yükleme durumunu göster
+        videoLoading.classList.remove('hidden');
+        video.classList.add('hidden');
+        videoError.classList.add('hidden');
+
+        // API isteği için form verilerini hazırla
+        const formData = new FormData();
+        formData.append('prompt', prompt);
+        formData.append('brand_input', brand);
+        formData.append('aspect_ratio', aspectRatio);
+        formData.append('duration', duration);
+
+        // API isteği gönder
+        fetch('/generate_video', {
+            method: 'POST',
+            body: formData
+        })
+        .then(response => {
+            if (!response.ok) {
+                return response.json().then(data => {
+                    throw new Error(data.error || 'Video oluşturulurken bir hata oluştu.');
+                });
+            }
+            return response.json();
+        })
+        .then(data => {
+            // Başarılı yanıt - videoyu güncelle
+            const videoUrl = data.video_url;
+            const newPrompt = data.prompt;
+
+            // Video kaynağını güncelle
+            video.src = videoUrl;
+            video.load(); // Videoyu yeniden yükle
+
+            // İndirme bağlantısını güncelle
+            if (downloadBtn) {
+                downloadBtn.href = videoUrl;
+            }
+
+            // Kullanılan prompt'u güncelle
+            if (usedPrompt) {
+                usedPrompt.textContent = newPrompt;
+            }
+
+            // Video yüklendiğinde yükleme animasyonunu gizle
+            video.onloadeddata = function() {
+                videoLoading.classList.add('hidden');
+                video.classList.remove('hidden');
+            };
+        })
+        .catch(error => {
+            // Hata durumunda
+            videoLoading.classList.add('hidden');
+            video.classList.remove('hidden');
+            alert('Video oluşturulurken bir hata oluştu: ' + error.message);
+            console.error('Error:', error);
+        });
+    });
+
+    // Düzenle butonuna tıklandığında düzenleme formunu göster
+    document.getElementById('editPromptBtn').addEventListener('click', function() {
+        const promptText = document.getElementById('usedPrompt').textContent;
+        document.getElementById('promptInput').value = promptText;
+
+        // Regenerate bölümüne scroll yap
+        document.querySelector('.regenerate-container').scrollIntoView({ behavior: 'smooth' });
+    });
+});
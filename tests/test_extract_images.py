@@ -0,0 +1,117 @@
+"""
+/extract-images uç noktasının yerel bir HTTP fixture sunucusuna karşı testleri.
+
+Çalıştırma:
+    python -m pytest -q tests
+"""
+import http.server
+import os
+import socketserver
+import sys
+import threading
+import unittest
+
+# Testler için geçmiş veritabanı ve dış servis anahtarları gerekmez
+os.environ["HISTORY_DB_PATH"] = ""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+
+PAGES = {
+    "/product/1": """<html><head>
+        <meta property="og:image" content="/img/main.jpg?utm_source=x">
+        </head><body>
+        <img src="/img/main.jpg">
+        <img data-src="/img/side.jpg" srcset="/img/side-small.jpg 200w, /img/side-large.jpg 800w">
+        <img src="data:image/gif;base64,R0lGOD">
+        </body></html>""",
+    "/product/2": """<html><body><img src="/img/main.jpg"><img src="/img/other.jpg"></body></html>""",
+}
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        FixtureHandler.requests_seen.append(self.path)
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/product/2")
+            self.end_headers()
+            return
+        body = PAGES.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ExtractImagesTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), FixtureHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        app_module.EXTRACT_ALLOW_PRIVATE = True
+        app_module._extract_cache.clear()
+        FixtureHandler.requests_seen.clear()
+        self.client = app_module.app.test_client()
+
+    def test_extracts_canonical_deduplicated_images(self):
+        response = self.client.post("/extract-images", json={"url": f"{self.base_url}/product/1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["product_images"], [
+            f"{self.base_url}/img/main.jpg",
+            f"{self.base_url}/img/side.jpg",
+            f"{self.base_url}/img/side-large.jpg",
+        ])
+
+    def test_multiple_pages_are_merged_and_cached(self):
+        urls = [f"{self.base_url}/product/1", f"{self.base_url}/product/2", f"{self.base_url}/missing"]
+        data = self.client.post("/extract-images", json={"urls": urls}).get_json()
+        self.assertEqual(data["product_images"][-1], f"{self.base_url}/img/other.jpg")
+        self.assertEqual(len(data["product_images"]), 4)
+        self.assertIn("error", data["results"][2])
+
+        self.client.post("/extract-images", json={"urls": urls[:2]})
+        self.assertEqual(FixtureHandler.requests_seen.count("/product/1"), 1)
+
+    def test_follows_redirects(self):
+        data = self.client.post("/extract-images", json={"url": f"{self.base_url}/redirect"}).get_json()
+        self.assertEqual(data["product_images"], [f"{self.base_url}/img/main.jpg", f"{self.base_url}/img/other.jpg"])
+
+    def test_rejects_private_addresses_by_default(self):
+        app_module.EXTRACT_ALLOW_PRIVATE = False
+        for url in (f"{self.base_url}/product/1", "http://169.254.169.254/latest/meta-data/", "http://[::1]/", "http://10.0.0.1/"):
+            response = self.client.post("/extract-images", json={"url": url})
+            self.assertEqual(response.status_code, 400, url)
+        self.assertEqual(FixtureHandler.requests_seen, [])
+
+    def test_rejects_non_http_schemes(self):
+        response = self.client.post("/extract-images", json={"url": "file:///etc/passwd"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_malformed_bodies(self):
+        for body in ([f"{self.base_url}/product/1"], {"urls": 5}, {"urls": f"{self.base_url}/product/1"}):
+            response = self.client.post("/extract-images", json=body)
+            self.assertEqual(response.status_code, 400, body)
+        self.assertEqual(FixtureHandler.requests_seen, [])
+
+if __name__ == "__main__":
+    unittest.main()